@@ -1,5 +1,7 @@
 from .errors import *
 from .parsing import *
+from .compiling import *
+from .breakers import *
 from .rendering import *
 from .registry import *
 from .forms import *
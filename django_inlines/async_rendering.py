@@ -0,0 +1,211 @@
+import asyncio
+import logging
+from functools import partial
+from itertools import chain
+from timeit import default_timer
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from django.utils.encoding import force_text
+from django.utils.safestring import mark_safe
+
+from django.core.exceptions import ValidationError
+
+from .parsing import Parser, is_plain_text
+from .inlines.model_inlines import (
+    group_prefetch_lookups, get_prefetch_queryset, assign_prefetched_objects,)
+from .errors import InlineValidationError
+from .breakers import breakers
+
+try:
+    from asgiref.sync import sync_to_async
+except ImportError:
+    def run_closing_connections(func, *args, **kwargs):
+        # The threads of the default executor are never cleaned up by
+        # Django, like the ones of the renderer's pool
+        close_old_connections()
+
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    def sync_to_async(func):
+        async def wrapper(*args, **kwargs):
+            return await asyncio.get_event_loop().run_in_executor(
+                None, partial(run_closing_connections, func, *args, **kwargs))
+        return wrapper
+
+__all__ = ('AsyncRendererMixin', 'aprefetch_objects',)
+
+
+logger = logging.getLogger(__name__)
+
+
+async def aprefetch_objects(inlines):
+    # The same as `prefetch_objects`, with the queries of every inline class
+    # and field running concurrently through the async ORM where available
+    groups, others = await sync_to_async(group_prefetch_lookups)(inlines)
+
+    async def fetch(field, group):
+        queryset, attname = get_prefetch_queryset(field, group)
+
+        if hasattr(queryset, '__aiter__'):
+            # Not a comprehension, those can't be asynchronous on Python 3.5
+            objects = []
+            async for obj in queryset:
+                objects.append(obj)
+        else:
+            objects = await sync_to_async(list)(queryset)
+        return assign_prefetched_objects(group, attname, objects)
+
+    for missed in await asyncio.gather(*(
+            fetch(field, group) for field, group in groups.values())):
+        others.extend(missed)
+
+    await asyncio.gather(*(aprocess_object(inline) for inline in others))
+
+
+async def aprocess_object(inline):
+    queryset = inline.get_queryset()
+
+    if not inline.has_default_get_object() or \
+            not hasattr(queryset, 'aget'):
+        await sync_to_async(inline.process_object)()
+        return
+
+    with inline.object_errors():
+        inline.object = await queryset.aget(**inline.get_query_args())
+
+
+class AsyncRendererMixin(object):
+
+    async def arender(self, content, media=None, raise_errors=False,
+                      log_errors=False, verbose_errors=True):
+        if is_plain_text(content):
+            return mark_safe(content)
+
+        try:
+            nodes, syntax_errors = Parser(media=media).parse(content)
+            content, inline_errors = await self.arender_nodes(nodes, media)
+        except Exception as err:
+            if log_errors:
+                logger.exception(err)
+            if getattr(settings, 'INLINE_DEBUG', raise_errors):
+                raise
+            return u''
+
+        if bool(syntax_errors or inline_errors):
+            self.handle_errors(
+                chain(syntax_errors, inline_errors),
+                raise_errors, log_errors, verbose_errors)
+            return u''
+        return mark_safe(content)
+
+    async def arender_nodes(self, nodes, media):
+        fragments = {}
+        deadline = self.get_deadline()
+        items = list(zip(nodes, self.create_inlines(nodes)))
+        await aprefetch_objects(
+            [inline for node, inline in items if inline is not None])
+
+        # Only the first occurrence of every inline renders concurrently,
+        # the others share its instance and reuse its fragment
+        first = {}
+
+        for node, inline in items:
+            if inline is not None and inline not in first:
+                first[inline] = node
+
+        results = dict(zip(first.values(), await asyncio.gather(*(
+            self.arender_node(node, media, inline, deadline)
+            for inline, node in first.items()))))
+
+        bits = []
+        errors = []
+
+        for node, inline in items:
+            if node in results:
+                bit, node_errors, rendered = results[node]
+
+                # Like in `render_node`, fallbacks are never shared
+                if rendered:
+                    fragments[(node.inline_cls, node.spec,)] = bit
+            else:
+                node_errors = []
+                bit = self.render_node(
+                    node, media, node_errors, fragments, inline, deadline)
+
+            bits.append(bit)
+            errors.extend(node_errors)
+        return u''.join(bits), errors
+
+    async def arender_node(self, node, media, inline, deadline=None):
+        # Returns the output of the inline, its errors and whether it was
+        # rendered, or its fallback used instead
+        errors = []
+        rendered = False
+
+        try:
+            if inline._errors is None:
+                if inline.aprocess is not None:
+                    await inline.aprocess()
+                else:
+                    await sync_to_async(inline.process)()
+
+            if inline.is_valid():
+                bit, rendered = await self.arender_inline(
+                    node, media, inline, deadline)
+            else:
+                # Raises the inline's errors
+                bit = node.render(media, inline)
+        except ValidationError as err:
+            bit = u''
+            errors.extend(
+                (InlineValidationError(node.lineno, msg)
+                    for msg in err.messages))
+        return force_text(bit), errors, rendered
+
+    async def arender_inline(self, node, media, inline, deadline=None):
+        # The same as `render_inline`. Inlines may define an `afull_render`
+        # coroutine, the synchronous methods run in a thread otherwise.
+        afull_render = inline.afull_render
+
+        if inline._meta.cache_timeout is not None or afull_render is None:
+            render = partial(
+                sync_to_async(inline.cached_render),
+                variant=node.variant, media=media)
+        else:
+            render = partial(afull_render, variant=node.variant, media=media)
+
+        if node.inline_cls._meta.render_budget is None and \
+                not breakers.enabled():
+            return await render(), True
+
+        # Only valid inlines get here, `arender_node` raises the errors of
+        # the others
+        breaker = breakers.get(node.inline_cls)
+
+        if not breaker.allow() or (
+                deadline is not None and default_timer() > deadline):
+            return inline.render_fallback(
+                variant=node.variant, media=media), False
+
+        start = default_timer()
+
+        try:
+            bit = await render()
+        except ValidationError:
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+
+        budget = self.get_render_budget(inline)
+
+        if budget is not None and default_timer() - start > budget:
+            breaker.trip()
+        else:
+            breaker.record_success()
+        return bit, True
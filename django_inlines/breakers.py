@@ -0,0 +1,110 @@
+from collections import deque
+from threading import Lock
+from timeit import default_timer
+
+from django.conf import settings
+
+__all__ = ('CircuitBreaker', 'BreakerRegistry', 'breakers',)
+
+
+class CircuitBreaker(object):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold=None, window=60, reset_timeout=30):
+        self.threshold = threshold
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.trips = 0
+        self.opened_at = None
+        self._failures = deque()
+        self._lock = Lock()
+
+    @property
+    def state(self):
+        opened_at = self.opened_at
+
+        if opened_at is None:
+            return self.CLOSED
+        if default_timer() - opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self):
+        # Half open breakers let renders through, the next success closes
+        # them and the next failure opens them again
+        return self.state != self.OPEN
+
+    def record_success(self):
+        if self.opened_at is not None:
+            with self._lock:
+                self.opened_at = None
+                self._failures.clear()
+
+    def record_failure(self):
+        now = default_timer()
+
+        with self._lock:
+            failures = self._failures
+            failures.append(now)
+
+            while failures and now - failures[0] > self.window:
+                failures.popleft()
+
+            if self.opened_at is not None or (
+                    self.threshold is not None and
+                    len(failures) >= self.threshold):
+                self._open(now)
+
+    def trip(self):
+        with self._lock:
+            self._open(default_timer())
+
+    def _open(self, now):
+        self.opened_at = now
+        self.trips += 1
+        self._failures.clear()
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'trips': self.trips,
+            'failures': len(self._failures)}
+
+
+class BreakerRegistry(object):
+
+    def __init__(self):
+        self._breakers = {}
+        self._lock = Lock()
+
+    def enabled(self):
+        return any(
+            getattr(settings, name, None) is not None for name in (
+                'INLINE_RENDER_BUDGET', 'INLINE_DOCUMENT_BUDGET',
+                'INLINE_BREAKER_THRESHOLD',))
+
+    def get(self, inline_cls):
+        try:
+            return self._breakers[inline_cls]
+        except KeyError:
+            with self._lock:
+                return self._breakers.setdefault(
+                    inline_cls, CircuitBreaker(
+                        getattr(settings, 'INLINE_BREAKER_THRESHOLD', None),
+                        getattr(settings, 'INLINE_BREAKER_WINDOW', 60),
+                        getattr(settings, 'INLINE_BREAKER_TIMEOUT', 30)))
+
+    def clear(self):
+        with self._lock:
+            self._breakers.clear()
+
+    def stats(self):
+        return dict(
+            ('%s.%s' % (inline_cls.__module__, inline_cls.__name__),
+                breaker.stats(),)
+            for inline_cls, breaker in list(self._breakers.items()))
+
+
+breakers = BreakerRegistry()
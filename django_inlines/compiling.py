@@ -0,0 +1,79 @@
+import json
+
+from .parsing import (
+    INLINE_START, INLINE_END, TOKEN_TEXT, TOKEN_INLINE, Token, Lexer, Parser,
+    TextNode, InlineSpec,)
+from .errors import InlineSyntaxError
+
+__all__ = ('Compiler', 'compiler',)
+
+
+class Compiler(object):
+    # Bump whenever the layout of compiled documents changes
+    version = 1
+
+    def compile(self, content):
+        parser = Parser()
+        nodes = []
+
+        for token in Lexer(content).iter_tokens():
+            if token.token_type == TOKEN_TEXT:
+                nodes.append((token.lineno, token.contents,))
+                continue
+
+            try:
+                name, variant, args, kwargs = \
+                    parser.parse_inline_token(token)
+            except InlineSyntaxError:
+                # Kept as is, the error is recreated when the document loads
+                nodes.append((token.lineno, token.contents, None,))
+            else:
+                nodes.append((
+                    token.lineno, token.contents,
+                    name, variant, args, dict(kwargs),))
+
+        return json.dumps({
+            'v': self.version,
+            't': (INLINE_START, INLINE_END,),
+            'n': nodes}, separators=(',', ':'))
+
+    def load(self, compiled, media=None):
+        try:
+            data = json.loads(compiled)
+        except (TypeError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or data.get('v') != self.version or \
+                data.get('t') != [INLINE_START, INLINE_END]:
+            return None
+
+        parser = Parser(media=media)
+        nodes = []
+        errors = []
+
+        for node in data['n']:
+            if len(node) == 2:
+                token = Token(TOKEN_TEXT, node[1])
+                token.lineno = node[0]
+                nodes.append(TextNode(token))
+                continue
+
+            token = Token(TOKEN_INLINE, node[1])
+            token.lineno = node[0]
+
+            try:
+                if node[2] is None:
+                    nodes.append(parser.parse_token(token))
+                else:
+                    name, variant, args, kwargs = node[2:]
+                    nodes.append(parser.create_inline_node(
+                        token, InlineSpec(
+                            name, variant, tuple(args),
+                            tuple(kwargs.items()))))
+            except InlineSyntaxError as err:
+                errors.append(err)
+
+        return nodes, errors
+
+
+compiler = Compiler()
@@ -10,4 +10,4 @@ class InlineField(forms.CharField):
 
     def validate(self, value):
         super(InlineField, self).validate(value)
-        renderer.render(value, raise_errors=True)
+        renderer.validate(value, raise_errors=True)
@@ -1,17 +1,40 @@
 import sys
 
 from collections import defaultdict, OrderedDict
+from hashlib import md5
 
 from django.core.exceptions import ValidationError
 
 from django.utils import six
+from django.utils.encoding import force_bytes, force_text
 from django.utils.translation import ugettext_lazy as _, ungettext_lazy as _n
 
 from .arguments import Argument
 
+try:
+    # Django 1.7
+    from django.core.cache import caches
+
+    def get_cache(alias):
+        return caches[alias]
+except ImportError:
+    from django.core.cache import get_cache
+
 __all__ = ('InlineOptions', 'InlineMetaClass', 'InlineBase', 'Inline',)
 
 
+CACHE_KEY_PREFIX = 'django_inlines'
+
+# Methods named like renderers of variants that aren't
+NON_VARIANT_RENDERERS = frozenset(('render_fallback',))
+
+
+def make_cache_key(*bits):
+    return '%s:%s' % (
+        CACHE_KEY_PREFIX, md5(force_bytes(u'|'.join(
+            force_text(bit) for bit in bits))).hexdigest())
+
+
 class InlineOptions(object):
 
     def __init__(self, meta, args, app_label):
@@ -19,8 +42,14 @@ class InlineOptions(object):
         self.args = args
         self.ordering = []
         self.variants = []
+        self.renderers = {}
         self.app_label = app_label
         self.abstract = getattr(meta, 'abstract', False)
+        self.cache_timeout = getattr(meta, 'cache_timeout', None)
+        self.cache_vary_on = getattr(meta, 'cache_vary_on', None)
+        self.cache_alias = getattr(meta, 'cache_alias', None)
+        self.render_budget = getattr(meta, 'render_budget', None)
+        self.cache_templates = getattr(meta, 'cache_templates', None)
 
     def _prepare(self, inline_mcs):
         args = inline_mcs._meta.args
@@ -31,6 +60,25 @@ class InlineOptions(object):
         if hasattr(self.meta, 'variants'):
             self.variants = list(self.meta.variants)
 
+        # The `render_<variant>` method of every variant, template inlines
+        # may render their variants with templates instead
+        self.renderers = dict(
+            (attr_name[len('render_'):], getattr(inline_mcs, attr_name),)
+            for attr_name in dir(inline_mcs)
+            if attr_name.startswith('render_') and
+            attr_name not in NON_VARIANT_RENDERERS)
+
+        if not self.abstract and not inline_mcs.template_variants:
+            for variant in self.variants:
+                assert variant in self.renderers, \
+                    '`%s` variant `%s` has no `render_%s` method' % (
+                        inline_mcs.__name__, variant, variant)
+
+        if self.cache_vary_on is not None:
+            self.cache_vary_on = list(self.cache_vary_on)
+            for arg in self.cache_vary_on:
+                assert arg in args, '`%s` is not a valid argument' % arg
+
         if hasattr(self.meta, 'ordering'):
             ordering = list(OrderedDict(
                 (order, True) for order in self.meta.ordering).keys())
@@ -121,17 +169,71 @@ class InlineMetaClass(type):
                 opts.ordering = base_meta.ordering
             if not bool(opts.variants):
                 opts.variants = base_meta.variants
+            for option in ('cache_timeout', 'cache_vary_on', 'cache_alias',
+                           'render_budget', 'cache_templates',):
+                if getattr(opts, option) is None:
+                    setattr(opts, option, getattr(base_meta, option))
 
 
 class InlineBase(object):
+    template_variants = False
+
+    # Coroutine versions of `process` and `full_render`, awaited by the async
+    # renderer when an inline defines them instead of running the others in
+    # a thread. Like `process`, `aprocess` has to set `_errors`, or `errors`
+    # processes the inline again synchronously.
+    aprocess = None
+    afull_render = None
 
     def full_render(self, variant=None, media=None):
-        renderer = getattr(self, 'render_%s' % variant, self.render)
-        return renderer()
+        renderer = self._meta.renderers.get(variant)
+
+        if renderer is None:
+            return self.render()
+        return renderer(self)
 
     def render(self):
         raise NotImplementedError
 
+    def render_fallback(self, variant=None, media=None):
+        return u''
+
+    def cached_render(self, variant=None, media=None):
+        timeout = self._meta.cache_timeout
+
+        if timeout is None:
+            return self.full_render(variant=variant, media=media)
+
+        cache = get_cache(self._meta.cache_alias or 'default')
+        key = self.get_cache_key(variant=variant, media=media)
+        content = cache.get(key)
+
+        if content is None:
+            content = force_text(
+                self.full_render(variant=variant, media=media))
+            cache.set(key, content, timeout)
+        return content
+
+    def get_cache_key(self, variant=None, media=None):
+        vary_on = self._meta.cache_vary_on
+
+        if vary_on is None:
+            vary_on = sorted(self.data.keys())
+
+        return make_cache_key(
+            self.__class__.__module__, self.__class__.__name__,
+            self.name, variant, media, *(
+                u'%s=%s' % (arg_name, self.get_cache_key_value(
+                    self.data.get(arg_name)))
+                for arg_name in vary_on))
+
+    def get_cache_key_value(self, value):
+        opts = getattr(value, '_meta', None)
+
+        if opts is not None and hasattr(value, 'pk'):
+            return u'%s.%s:%s' % (opts.app_label, opts.model_name, value.pk)
+        return repr(value)
+
     def __init__(self, name, *args, **kwargs):
         self.name = name
 
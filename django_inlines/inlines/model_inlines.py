@@ -1,14 +1,60 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from uuid import uuid4
+
 from django.utils import six
+from django.utils.encoding import force_text
 from django.utils.translation import ugettext_lazy as _
 
 from django.core.exceptions import (
     ObjectDoesNotExist, MultipleObjectsReturned, ValidationError,)
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.fields import FieldDoesNotExist
+from django.db.models.signals import post_save, post_delete
+
+try:
+    # Django 1.11
+    from django.core.exceptions import EmptyResultSet
+except ImportError:
+    from django.db.models.sql.datastructures import EmptyResultSet
 
 from .model_arguments import QueryArgument
-from .inlines import InlineBase, InlineMetaClass, InlineOptions
+from .inlines import (
+    InlineBase, InlineMetaClass, InlineOptions, get_cache, make_cache_key,)
 from .template_inlines import TemplateInlineMixin
 
-__all__ = ('ModelInlineBase', 'ModelInline', 'ModelTemplateInline',)
+__all__ = (
+    'ModelInlineBase', 'ModelInline', 'ModelTemplateInline',
+    'prefetch_objects',)
+
+
+# The cache aliases holding rendered fragments of each model's inlines
+cached_models = defaultdict(set)
+
+
+def get_model_generation_key(model):
+    opts = model._meta
+    return make_cache_key('generation', opts.app_label, opts.model_name)
+
+
+def get_model_generation(model, alias):
+    # Rendered fragments of model inlines include their model's generation
+    # in their cache key, changing it invalidates all of them at once.
+    cache = get_cache(alias)
+    key = get_model_generation_key(model)
+    generation = cache.get(key)
+
+    if generation is None:
+        cache.add(key, uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate_model_cache(sender, **kwargs):
+    key = get_model_generation_key(sender)
+
+    for alias in cached_models.get(sender, ()):
+        get_cache(alias).set(key, uuid4().hex, None)
 
 
 class ModelInlineOptions(InlineOptions):
@@ -20,6 +66,18 @@ class ModelInlineOptions(InlineOptions):
 
 class ModelInlineMetaClass(InlineMetaClass):
 
+    def _prepare(cls):
+        super(ModelInlineMetaClass, cls)._prepare()
+        opts = cls._meta
+
+        if opts.model is not None and opts.cache_timeout is not None:
+            cached_models[opts.model].add(opts.cache_alias or 'default')
+
+            for signal in (post_save, post_delete,):
+                signal.connect(
+                    invalidate_model_cache, sender=opts.model,
+                    dispatch_uid='django_inlines.invalidate_model_cache')
+
     def get_inline_options(cls, base_meta, meta, args, app_label=None):
         opts = ModelInlineOptions(meta, args, app_label)
         cls.carryover_options(base_meta, opts)
@@ -47,30 +105,182 @@ class ModelInlineBase(InlineBase):
     def get_queryset(self):
         return self._meta.model._default_manager.get_queryset()
 
-    def get_object(self):
+    def get_query_args(self):
         data = self.data
 
-        query_args = dict((
+        return dict((
             (arg.field, data[arg.name],)
             for arg in self._meta.args.values()
             if isinstance(arg, QueryArgument)))
 
-        return self.get_queryset().get(**query_args)
+    def get_object(self):
+        return self.get_queryset().get(**self.get_query_args())
+
+    def get_cache_key(self, variant=None, media=None):
+        return make_cache_key(
+            super(ModelInlineBase, self).get_cache_key(
+                variant=variant, media=media),
+            get_model_generation(
+                self._meta.model, self._meta.cache_alias or 'default'))
+
+    def has_default_get_object(self):
+        return six.get_unbound_function(self.__class__.get_object) is \
+            six.get_unbound_function(ModelInlineBase.get_object)
+
+    def has_default_process(self):
+        return six.get_unbound_function(self.__class__.process) is \
+            six.get_unbound_function(ModelInlineBase.process)
+
+    def get_prefetch_lookup(self):
+        # The (field, value) this inline's object can be fetched by together
+        # with other inlines of its class, None if it has to use `get_object`
+        if not self.has_default_get_object():
+            return None
+
+        query_args = self.get_query_args()
+
+        if len(query_args) != 1:
+            return None
+
+        field, value = query_args.popitem()
+
+        if field == 'pk':
+            model_field = self._meta.model._meta.pk
+        elif LOOKUP_SEP in field:
+            return None
+        else:
+            try:
+                model_field = self._meta.model._meta.get_field(field)
+            except FieldDoesNotExist:
+                return None
+
+        try:
+            value = model_field.to_python(value)
+        except ValidationError:
+            return None
+
+        # The database may match other strings too, e.g. without regard to
+        # case, and only `get` reports them as multiple objects. Unique
+        # fields match a single row either way.
+        if isinstance(value, six.string_types) and not model_field.unique:
+            return None
+        return field, value
 
     def process(self):
+        self.process_arguments()
+
+        if not bool(self._errors):
+            self.process_object()
+
+    def process_arguments(self):
         super(ModelInlineBase, self).process()
 
-        if bool(self._errors):
-            return
+    def process_object(self, objects=None):
+        # `objects` are the prefetched objects matching this inline's lookup
+        with self.object_errors():
+            if objects is None:
+                self.object = self.get_object()
+            elif len(objects) == 1:
+                self.object = objects[0]
+            elif not objects:
+                raise self._meta.model.DoesNotExist
+            else:
+                raise self._meta.model.MultipleObjectsReturned
 
+    @contextmanager
+    def object_errors(self):
         try:
-            self.object = self.get_object()
+            yield
         except ObjectDoesNotExist:
             self.add_errors(ValidationError(_('Object does not exist')))
         except MultipleObjectsReturned:
             self.add_errors(ValidationError(_('Multiple objects returned')))
 
 
+def prefetch_objects(inlines):
+    # Processes the arguments of all model inlines and fetches the objects
+    # of the ones that look up a single field with one query per inline
+    # class, field and queryset, instead of one query per inline. Inlines
+    # that override `process` are left to it.
+    groups, others = group_prefetch_lookups(inlines)
+
+    for field, group in groups.values():
+        queryset, attname = get_prefetch_queryset(field, group)
+        others.extend(assign_prefetched_objects(group, attname, queryset))
+
+    for inline in others:
+        inline.process_object()
+
+
+def group_prefetch_lookups(inlines):
+    # Returns the inlines grouped by inline class, lookup field and
+    # queryset, and the ones that have to look their object up on their own
+    groups = {}
+    others = []
+
+    for inline in inlines:
+        if not isinstance(inline, ModelInlineBase) or \
+                inline._errors is not None or \
+                not inline.has_default_process():
+            continue
+
+        inline.process_arguments()
+
+        if bool(inline._errors):
+            continue
+
+        lookup = inline.get_prefetch_lookup()
+        queryset_key = None
+
+        if lookup is not None:
+            # `get_queryset` may depend on the inline, only inlines with the
+            # same query share one
+            queryset_key = get_queryset_key(inline.get_queryset())
+
+        if queryset_key is None:
+            others.append(inline)
+        else:
+            field, value = lookup
+            groups.setdefault(
+                (inline.__class__, field, queryset_key,), (field, []))[1] \
+                .append((inline, value,))
+    return groups, others
+
+
+def get_queryset_key(queryset):
+    try:
+        return force_text(queryset.query)
+    except EmptyResultSet:
+        return None
+
+
+def get_prefetch_queryset(field, group):
+    model = group[0][0]._meta.model
+    attname = \
+        'pk' if field == 'pk' else model._meta.get_field(field).attname
+    queryset = group[0][0].get_queryset().filter(**{
+        '%s__in' % field: set(value for inline, value in group)})
+    return queryset, attname
+
+
+def assign_prefetched_objects(group, attname, queryset):
+    # Returns the inlines that weren't matched by any of the objects
+    objects = defaultdict(list)
+    others = []
+
+    for obj in queryset:
+        objects[getattr(obj, attname)].append(obj)
+
+    for inline, value in group:
+        if value in objects:
+            inline.process_object(objects[value])
+        else:
+            # The database may have matched it differently, e.g. without
+            # regard to case, leave it to the inline's own lookup
+            others.append(inline)
+    return others
+
+
 class ModelTemplateInlineBase(TemplateInlineMixin, ModelInlineBase):
 
     def get_context(self):
@@ -1,14 +1,47 @@
 from os import path
 
-from django.template import TemplateDoesNotExist
-from django.template.loader import render_to_string
+from django.conf import settings
+from django.template import Context, Template, TemplateDoesNotExist
+from django.template.loader import select_template
 
 from .inlines import Inline
 
+try:
+    # Django 1.8
+    from django.core.signals import setting_changed
+except ImportError:
+    from django.test.signals import setting_changed
+
 __all__ = ('TemplateInlineMixin', 'TemplateInline',)
 
 
+template_cache = {}
+
+# The template found for every list of candidates, None when there is none
+# and the inline's `render` is used instead
+resolved_templates = {}
+
+
+def clear_resolved_templates(setting, **kwargs):
+    if setting.startswith('TEMPLATE') or setting in (
+            'INSTALLED_APPS', 'DEBUG',):
+        resolved_templates.clear()
+
+
+setting_changed.connect(
+    clear_resolved_templates,
+    dispatch_uid='django_inlines.clear_resolved_templates')
+
+
+def render_template(template, context):
+    # Templates of the template backends take a dict, the others a Context
+    if isinstance(template, Template):
+        context = Context(context)
+    return template.render(context)
+
+
 class TemplateInlineMixin(object):
+    template_variants = True
 
     def get_context(self):
         return {}
@@ -22,6 +55,22 @@ class TemplateInlineMixin(object):
         return 'html'
 
     def get_templates(self, variant=None, media=None):
+        # The candidates only depend on these, unless `cache_templates` is
+        # turned off in `Meta` for inlines that pick them some other way
+        extension = self.get_template_extension(variant=variant, media=media)
+
+        if self._meta.cache_templates is False:
+            return self.build_templates(variant, media, extension)
+
+        key = (self.__class__, self.name, variant, media, extension,)
+        templates = template_cache.get(key)
+
+        if templates is None:
+            templates = template_cache[key] = tuple(
+                self.build_templates(variant, media, extension))
+        return list(templates)
+
+    def build_templates(self, variant, media, extension):
         base_templates = []
 
         base_tmpl_dir = 'inlines'
@@ -31,7 +80,7 @@ class TemplateInlineMixin(object):
             'name': self.name,
             'variant': variant,
             'cls_name': self.__class__.__name__.lower(),
-            'ext': self.get_template_extension(variant=variant, media=media)}
+            'ext': extension}
 
         if variant is not None:
             base_templates.extend((
@@ -63,20 +112,41 @@ class TemplateInlineMixin(object):
         return templates
 
     def full_render(self, variant=None, media=None):
-        renderer = getattr(self, 'render_%s' % variant, None)
+        renderer = self._meta.renderers.get(variant)
 
         if renderer is not None:
-            return renderer()
+            return renderer(self)
+
+        templates = self.get_templates(variant=variant, media=media)
+        template = self.resolve_template(templates)
+
+        if template is not None:
+            return render_template(template, self.get_full_context())
 
         try:
-            return render_to_string(
-                self.get_templates(variant=variant, media=media),
-                self.get_full_context())
-        except TemplateDoesNotExist as err:
-            try:
-                return self.render()
-            except NotImplementedError:
-                raise err
+            return self.render()
+        except NotImplementedError:
+            raise TemplateDoesNotExist(', '.join(templates))
+
+    def resolve_template(self, templates):
+        # Returns None when none of the templates exist. They are looked up
+        # on every render while debugging, so new and changed ones are
+        # picked up.
+        key = tuple(templates)
+
+        try:
+            return resolved_templates[key]
+        except KeyError:
+            pass
+
+        try:
+            template = select_template(templates)
+        except TemplateDoesNotExist:
+            template = None
+
+        if not settings.DEBUG and self._meta.cache_templates is not False:
+            resolved_templates[key] = template
+        return template
 
 
 class TemplateInline(TemplateInlineMixin, Inline):
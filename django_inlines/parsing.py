@@ -1,14 +1,21 @@
 import re
 
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.utils import six
+from django.utils.encoding import force_text
 from django.utils.translation import ugettext_lazy as _
-from django.utils.text import smart_split, unescape_string_literal
 
+from .utils import LRUCache
 from .registry import registry
 from .errors import InlineSyntaxError, InlineValidationError
 
-__all__ = ('Token', 'Lexer', 'BaseNode', 'InlineNode', 'TextNode', 'Parser',)
+__all__ = (
+    'Token', 'Lexer', 'BaseNode', 'InlineNode', 'TextNode', 'InlineSpec',
+    'Document', 'Parser', 'parse_cache', 'spec_cache',)
 
 
 INLINE_START = getattr(settings, 'INLINE_TAG_START', '{{')
@@ -17,9 +24,27 @@ INLINE_END = getattr(settings, 'INLINE_TAG_END', '}}')
 INLINE_START_LEN = len(INLINE_START)
 INLINE_END_LEN = len(INLINE_END)
 
-KWARG_RE = re.compile(r'(?:(\w+)=)?(.+)')
-INLINE_RE = re.compile('(%s.*?%s)' % (
-    re.escape(INLINE_START), re.escape(INLINE_END)))
+INLINE_PARSE_CACHE_SIZE = getattr(settings, 'INLINE_PARSE_CACHE_SIZE', 256)
+INLINE_SPEC_CACHE_SIZE = getattr(settings, 'INLINE_SPEC_CACHE_SIZE', 1024)
+
+# Splits inline contents into arguments the same way `smart_split` does,
+# while picking out an optional `keyword=` prefix of every argument.
+ARG_RE = re.compile(r"""
+    (?:(\w+)=)?
+    ((?:
+        [^\s'"]*
+        (?:
+            (?:"(?:[^"\\]|\\.)*" | '(?:[^'\\]|\\.)*')
+            [^\s'"]*
+        )+
+    ) | \S+)
+""", re.VERBOSE)
+
+NEWLINE_RE = re.compile('\n')
+
+# The name of an inline without keyword arguments or quotes before the first
+# space, which is always split out the same way as by `ARG_RE`
+INLINE_NAME_RE = re.compile(r"([^\s:'\"=]+)(?::[^\s'\"=]*)?(?:\s|$)")
 
 TOKEN_TEXT = 0
 TOKEN_INLINE = 1
@@ -28,13 +53,115 @@ TOKEN_MAPPING = {
     TOKEN_TEXT: 'Text',
     TOKEN_INLINE: 'Inline'}
 
+# The most tokens that are moved along one by one when an edit splits the
+# segment they were lexed in
+SEGMENT_SIZE = 64
 
-class Token(object):
+parse_cache = LRUCache(INLINE_PARSE_CACHE_SIZE)
+spec_cache = LRUCache(INLINE_SPEC_CACHE_SIZE)
+
+# The parsed form of an inline's contents. It's shared between all inlines
+# with the same contents, so `args` is a tuple and `kwargs` a tuple of
+# (name, value) pairs.
+InlineSpec = namedtuple('InlineSpec', ('name', 'variant', 'args', 'kwargs',))
+
+
+class LineIndex(object):
+    __slots__ = ('content', '_newlines',)
+
+    def __init__(self, content):
+        self.content = content
+        self._newlines = None
+
+    def update(self, content):
+        self.content = content
+        self._newlines = None
+
+    def lineno(self, position):
+        # Line numbers are only needed for error messages, so the newline
+        # positions aren't collected until the first one is asked for.
+        if self._newlines is None:
+            self._newlines = [
+                match.start() for match in NEWLINE_RE.finditer(self.content)]
+        return bisect_left(self._newlines, position) + 1
+
+
+class Segment(object):
+    # A run of tokens lexed together. Their positions are relative to the
+    # segment, so reparsing moves the tokens after an edit along by moving
+    # the segments after it.
+    __slots__ = ('offset', 'line_index', 'next',)
+
+    def __init__(self, offset, line_index):
+        self.offset = offset
+        self.line_index = line_index
+        self.next = None
+
+
+class TokenPositions(object):
+    # The positions of `tokens` as a sequence to bisect, without collecting
+    # all of them
+    __slots__ = ('tokens',)
 
-    def __init__(self, token_type, contents):
-        self.lineno = None
-        self.contents = contents
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __getitem__(self, index):
+        return self.tokens[index].position
+
+
+class Token(object):
+    __slots__ = (
+        'token_type', 'segment', '_contents', '_position', '_end',
+        '_lineno',)
+
+    def __init__(self, token_type, contents, position=None, segment=None,
+                 end=None):
+        self._lineno = None
+        self._contents = contents
         self.token_type = token_type
+        self.segment = segment
+        self._position = position
+        self._end = end
+
+    @property
+    def position(self):
+        if self.segment is None:
+            return self._position
+        return self.segment.offset + self._position
+
+    @property
+    def end(self):
+        if self.segment is None or self._end is None:
+            return self._end
+        return self.segment.offset + self._end
+
+    @property
+    def line_index(self):
+        if self.segment is not None:
+            return self.segment.line_index
+
+    @property
+    def contents(self):
+        # Text tokens only point into the lexed content and are sliced when
+        # their contents are needed.
+        if self._contents is None:
+            return self.line_index.content[self.position:self.end]
+        return self._contents
+
+    @property
+    def lineno(self):
+        # Not kept, reparsing may move the token to another line
+        if self._lineno is None and self.segment is not None:
+            return self.segment.line_index.lineno(self.position)
+        return self._lineno
+
+    @lineno.setter
+    def lineno(self, lineno):
+        self._lineno = lineno
 
     def __str__(self):
         return (
@@ -43,76 +170,130 @@ class Token(object):
                 self.contents.replace('\n', ''),))
 
     def split_contents(self):
-        return list(smart_split(self.contents))
+        return [
+            match.group(0)
+            for match in ARG_RE.finditer(force_text(self.contents))]
+
+
+def is_plain_text(content):
+    return isinstance(content, six.text_type) and INLINE_START not in content
 
 
 class Lexer(object):
 
-    def __init__(self, content):
-        self.lineno = 1
+    def __init__(self, content, line_index=None):
         self.content = content
+        self.line_index = \
+            LineIndex(content) if line_index is None else line_index
+        self.first_segment = None
+        self.segment = None
+        self._segment_tokens = 0
 
     def tokenize(self):
-        result = []
-        in_tag = False
+        return list(self.iter_tokens())
 
-        for bit in INLINE_RE.split(self.content):
-            if bit:
-                result.append(self.create_token(bit, in_tag))
-            in_tag = not in_tag
+    def iter_tokens(self, position=0):
+        content = self.content
+        text_start = position
+        start = content.find(INLINE_START, position)
 
-        return result
+        while start != -1:
+            end = content.find(INLINE_END, start + INLINE_START_LEN)
 
-    def create_token(self, token_string, in_tag):
-        if in_tag:
-            if token_string.startswith(INLINE_START):
-                token = Token(
-                    TOKEN_INLINE,
-                    token_string[INLINE_START_LEN:-INLINE_END_LEN].strip())
-        else:
-            token = Token(TOKEN_TEXT, token_string)
+            if end == -1:
+                break
+
+            newline = content.find('\n', start + INLINE_START_LEN, end)
+
+            if newline != -1:
+                # Inlines may not span lines, look for a start tag after the
+                # line break instead.
+                start = content.find(
+                    INLINE_START,
+                    max(start + 1, newline - INLINE_START_LEN + 1))
+                continue
+
+            if start > text_start:
+                yield self.create_token(False, text_start, start)
+
+            text_start = end + INLINE_END_LEN
+            yield self.create_token(True, start, text_start)
+            start = content.find(INLINE_START, text_start)
+
+        if text_start < len(content):
+            yield self.create_token(False, text_start, len(content))
+
+    def create_token(self, in_tag, start, end):
+        segment = self.segment
+
+        if segment is None or self._segment_tokens == SEGMENT_SIZE:
+            segment = Segment(start, self.line_index)
+
+            if self.segment is None:
+                self.first_segment = segment
+            else:
+                self.segment.next = segment
+
+            self.segment = segment
+            self._segment_tokens = 0
 
-        token.lineno = self.lineno
-        self.lineno += token_string.count('\n')
+        self._segment_tokens += 1
+        offset = segment.offset
 
-        return token
+        if in_tag:
+            return Token(
+                TOKEN_INLINE,
+                self.content[
+                    start + INLINE_START_LEN:end - INLINE_END_LEN].strip(),
+                start - offset, segment)
+        return Token(TOKEN_TEXT, None, start - offset, segment, end - offset)
 
 
 class BaseNode(object):
+    __slots__ = ('token',)
 
     def __init__(self, token):
-        self.lineno = token.lineno
-        self.contents = token.contents
+        self.token = token
+
+    @property
+    def contents(self):
+        return self.token.contents
+
+    @property
+    def lineno(self):
+        return self.token.lineno
 
     def render(self, variant):
         raise NotImplementedError
 
 
-class InlineFactory(object):
+class InlineNode(BaseNode):
+    __slots__ = ('inline_cls', 'spec',)
 
-    def __init__(self, inline_cls, name, args, kwargs):
-        self.name = name
-        self.args = args
-        self.kwargs = kwargs
+    def __init__(self, inline_cls, spec, token):
+        self.spec = spec
         self.inline_cls = inline_cls
+        super(InlineNode, self).__init__(token)
 
-    def __call__(self):
-        return self.inline_cls(self.name, *self.args, **self.kwargs)
+    @property
+    def variant(self):
+        return self.spec.variant
 
+    def create_inline(self):
+        spec = self.spec
+        return self.inline_cls(spec.name, *spec.args, **dict(spec.kwargs))
 
-class InlineNode(BaseNode):
+    def render(self, media=None, inline=None):
+        inline = self.validate(inline)
+        return inline.cached_render(variant=self.variant, media=media)
 
-    def __init__(self, inline_factory, variant, token):
-        self.token = token
-        self.variant = variant
-        self.inline_factory = inline_factory
-        super(InlineNode, self).__init__(token)
-
-    def render(self, media=None):
-        inline = self.inline_factory()
+    def validate(self, inline=None):
+        # Returns the processed inline, raises its errors if it's invalid
+        if inline is None:
+            inline = self.create_inline()
 
         if inline.is_valid():
-            return inline.full_render(variant=self.variant, media=media)
+            return inline
 
         errors = []
         lineno = self.token.lineno
@@ -143,90 +324,288 @@ class InlineNode(BaseNode):
 
 
 class TextNode(BaseNode):
-
-    def __init__(self, token):
-        super(TextNode, self).__init__(token)
+    __slots__ = ()
 
     def render(self, media=None):
-        return self.contents
+        return self.token.contents
+
+
+class Document(object):
+    __slots__ = (
+        'content', 'media', 'version', 'tokens', 'results', 'stale',)
+
+    def __init__(self, content, media, version, tokens, results):
+        self.media = media
+        self.content = content
+        self.version = version
+        self.tokens = tokens
+        # The node parsed from each token, or the syntax error it raised
+        self.results = results
+        # Reparsed documents share their tokens with the new one, which
+        # moves them along
+        self.stale = False
+
+    def check_stale(self):
+        if self.stale:
+            raise ValueError(
+                'The document was reparsed, use the document `reparse` '
+                'returned instead')
+
+    @property
+    def nodes(self):
+        self.check_stale()
+        return [
+            result for result in self.results
+            if isinstance(result, BaseNode)]
+
+    @property
+    def errors(self):
+        self.check_stale()
+        errors = []
+
+        for token, result in zip(self.tokens, self.results):
+            if isinstance(result, InlineSyntaxError):
+                # Reparsing may have moved the token to another line
+                result.lineno = token.lineno
+                errors.append(result)
+        return errors
 
 
 class Parser(object):
 
     def __init__(self, media=None):
         self.media = media
+        self._inline_classes = {}
 
     def parse(self, content):
+        # Nodes hold no per-render state, so the parse result for unchanged
+        # content can be shared for as long as the registry stays the same.
+        key = (content, self.media, registry.version)
+        result = parse_cache.get(key)
+
+        if result is None:
+            nodes, errors = self.parse_content(content)
+            result = (tuple(nodes), tuple(errors),)
+            parse_cache.set(key, result)
+
+        return list(result[0]), list(result[1])
+
+    def parse_content(self, content):
         errors = []
         inline_nodes = []
 
-        for token in Lexer(content).tokenize():
-            if token.token_type == TOKEN_INLINE:
-                try:
-                    name, variant, args, kwargs = \
-                        self.parse_inline_token(token)
-                except InlineSyntaxError as err:
-                    errors.append(err)
-                    continue
-
-                try:
-                    inline_cls = registry.get_registered_inline(
-                        name, variant=variant, media=self.media)
-                except registry.NotRegistered:
-                    errors.append(
-                        InlineSyntaxError(
-                            token.lineno,
-                            _(u'Inline `%(inline_name)s` is not registered.'),
-                            params={'inline_name': name}))
-                    continue
-                except registry.InvalidVariant:
-                    errors.append(
-                        InlineSyntaxError(
-                            token.lineno,
-                            _(u'`%(variant)s` is not a valid variant for '
-                              u'inline `%(inline_name)s`'),
-                            params={'variant': variant, 'inline_name': name}))
-                    continue
-
-                inline_nodes.append(
-                    InlineNode(
-                        InlineFactory(
-                            inline_cls, name, args, kwargs), variant, token))
-            else:
-                inline_nodes.append(TextNode(token))
+        for token in Lexer(content).iter_tokens():
+            try:
+                inline_nodes.append(self.parse_token(token))
+            except InlineSyntaxError as err:
+                errors.append(err)
         return inline_nodes, errors
 
+    def parse_document(self, content):
+        tokens = Lexer(content).tokenize()
+        return Document(
+            content, self.media, registry.version, tokens,
+            [self.parse_result(token) for token in tokens])
+
+    def reparse(self, document, start, end, text):
+        # Replaces `document.content[start:end]` with `text`. Only the tokens
+        # from the start of the edited line up to the first token boundary
+        # past the edit that lines up with the previous parse are lexed and
+        # parsed again. The tokens and nodes after it are kept and moved
+        # along with their segments, so `document` is stale afterwards. It
+        # can't be rendered anymore and is parsed from scratch if it's
+        # reparsed again. It's left as it was if parsing fails.
+        old_content = document.content
+        content = old_content[:start] + text + old_content[end:]
+        tokens = document.tokens
+
+        if document.stale or not tokens or \
+                document.media != self.media or \
+                document.version != registry.version:
+            return self.parse_document(content)
+
+        results = document.results
+        positions = TokenPositions(tokens)
+        offset = len(text) - (end - start)
+
+        # Inlines can't span lines, so the tokens before the one that holds
+        # the start of the edited line are still the same.
+        first = max(bisect_right(
+            positions, old_content.rfind('\n', 0, start) + 1) - 1, 0)
+
+        # The edit may turn that token into text that joins the text before it
+        if first and tokens[first - 1].token_type == TOKEN_TEXT:
+            first -= 1
+
+        lexer = Lexer(content)
+        new_tokens = tokens[:first]
+        new_results = results[:first]
+        resync = len(tokens)
+
+        for token in lexer.iter_tokens(positions[first]):
+            old_position = token.position - offset
+
+            if old_position >= end:
+                idx = bisect_left(positions, old_position, first)
+
+                if idx < len(tokens) and positions[idx] == old_position:
+                    resync = idx
+                    break
+
+            new_tokens.append(token)
+            new_results.append(self.parse_result(token))
+
+        # Nothing is changed before here, the tokens of `document` are
+        # moved along from now on
+        document.stale = True
+
+        # Every revision of the content shares its line index, the tokens
+        # before the edit point to the new content with it
+        line_index = tokens[0].line_index
+        line_index.update(content)
+        segment = lexer.first_segment
+
+        while segment is not None:
+            segment.line_index = line_index
+            segment = segment.next
+
+        if resync < len(tokens):
+            segment = tokens[resync].segment
+
+            if resync and tokens[resync - 1].segment is segment:
+                segment = self.split_segment(tokens, resync)
+
+            moved = segment
+
+            while moved is not None:
+                moved.offset += offset
+                moved = moved.next
+
+            new_tokens.extend(tokens[resync:])
+            new_results.extend(results[resync:])
+
+        if lexer.segment is not None:
+            lexer.segment.next = segment
+            segment = lexer.first_segment
+        if first:
+            tokens[first - 1].segment.next = segment
+
+        return Document(
+            content, self.media, document.version, new_tokens, new_results)
+
+    def split_segment(self, tokens, index):
+        # Moves the tokens of a segment from `index` on to a segment of
+        # their own
+        segment = tokens[index].segment
+        split = Segment(segment.offset, segment.line_index)
+        split.next = segment.next
+        segment.next = None
+
+        while index < len(tokens) and tokens[index].segment is segment:
+            tokens[index].segment = split
+            index += 1
+        return split
+
+    def parse_result(self, token):
+        try:
+            return self.parse_token(token)
+        except InlineSyntaxError as err:
+            return err
+
+    def parse_token(self, token):
+        if token.token_type != TOKEN_INLINE:
+            return TextNode(token)
+
+        name = self.match_unregistered(token)
+
+        if name is not None:
+            raise self.not_registered_error(token, name)
+
+        return self.create_inline_node(token, self.parse_inline_token(token))
+
+    def match_unregistered(self, token):
+        # Returns the name of an inline that is not registered when that's
+        # the only error it can have, so its arguments aren't parsed. Inlines
+        # with keyword arguments may have errors reported before it.
+        contents = token.contents
+
+        if '=' in contents:
+            return None
+
+        match = INLINE_NAME_RE.match(contents)
+
+        if match is None or match.group(1) in registry.slugs:
+            return None
+        return match.group(1)
+
+    def not_registered_error(self, token, name):
+        return InlineSyntaxError(
+            token.lineno, _(u'Inline `%(inline_name)s` is not registered.'),
+            params={'inline_name': name})
+
+    def create_inline_node(self, token, spec):
+        name, variant = spec.name, spec.variant
+        inline_cls = self._inline_classes.get((name, variant,))
+
+        if inline_cls is not None:
+            return InlineNode(inline_cls, spec, token)
+
+        try:
+            inline_cls = registry.get_registered_inline(
+                name, variant=variant, media=self.media)
+        except registry.NotRegistered:
+            raise self.not_registered_error(token, name)
+        except registry.InvalidVariant:
+            raise InlineSyntaxError(
+                token.lineno,
+                _(u'`%(variant)s` is not a valid variant for '
+                  u'inline `%(inline_name)s`'),
+                params={'variant': variant, 'inline_name': name})
+
+        self._inline_classes[(name, variant,)] = inline_cls
+        return InlineNode(inline_cls, spec, token)
+
     def parse_inline_token(self, token):
-        bits = token.split_contents()
+        spec = spec_cache.get(token.contents)
+
+        if spec is None:
+            spec = self.parse_inline_contents(token)
+            spec_cache.set(token.contents, spec)
 
-        if len(bits) == 0:
+        return spec
+
+    def parse_inline_contents(self, token):
+        bits = ARG_RE.finditer(force_text(token.contents))
+
+        for match in bits:
+            ibits = match.group(0).split(':')
+            break
+        else:
             raise InlineSyntaxError(token.lineno, _(u'Empty inline found.'))
 
         args = []
         kwargs = {}
         in_kwargs = False
-        ibits = bits.pop(0).split(':')
         name, variant = ibits if len(ibits) == 2 else (ibits[0], None,)
 
-        for arg in bits:
-            match = KWARG_RE.match(arg)
-            if match:
-                k, v = match.groups()
-                try:
-                    v = unescape_string_literal(v)
-                except ValueError:
-                    # Not a literal (i.e. doesn't start and end w\ ' or ")
-                    pass
-                if k is None:
-                    if in_kwargs:
-                        raise InlineSyntaxError(
-                            token.lineno, _(
-                                u'Inline `%(inline_content)s`, '
-                                u'non-keyword argument found after keyword '
-                                u'argument.'),
-                            params={'inline_content': token.contents})
-                    args.append(v)
-                else:
-                    in_kwargs = True
-                    kwargs[k] = v
-        return name, variant, args, kwargs
+        for match in bits:
+            k, v = match.groups()
+
+            if v[0] in '"\'' and v[-1] == v[0]:
+                # A string literal, unescape it like `unescape_string_literal`
+                quote = v[0]
+                v = v[1:-1].replace('\\' + quote, quote).replace('\\\\', '\\')
+
+            if k is None:
+                if in_kwargs:
+                    raise InlineSyntaxError(
+                        token.lineno, _(
+                            u'Inline `%(inline_content)s`, '
+                            u'non-keyword argument found after keyword '
+                            u'argument.'),
+                        params={'inline_content': token.contents})
+                args.append(v)
+            else:
+                in_kwargs = True
+                kwargs[k] = v
+        return InlineSpec(name, variant, tuple(args), tuple(kwargs.items()))
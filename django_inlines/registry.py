@@ -1,8 +1,21 @@
 from threading import RLock
 
+from django.conf import settings
 from django.utils import six
 
-__all__ = ('InlineRegistryItem', 'InlineRegistry', 'registry',)
+try:
+    # Django 1.7
+    from django.utils.module_loading import import_string
+except ImportError:
+    from django.utils.module_loading import import_by_path as import_string
+
+__all__ = (
+    'InlineRegistryItem', 'LazyInlineRegistryItem', 'InlineRegistry',
+    'registry', 'autodiscover',)
+
+
+# Marks variants that are only valid for a media specific inline class
+INVALID_VARIANT = object()
 
 
 class InvalidVariant(Exception):
@@ -33,6 +46,50 @@ class InlineRegistryItem(object):
 
         return self.default_inline_cls
 
+    def get_dispatch_items(self, inline_slug):
+        # The ((slug, variant, media), inline class) of every valid lookup,
+        # lookups with any other media fall back to the default class
+        default_cls = self.default_inline_cls
+        variants = [None] + list(self._variants)
+
+        for variant in variants:
+            yield (inline_slug, variant, None,), default_cls
+
+        for media, (media_cls, media_variants) in self._media.items():
+            for variant in variants:
+                yield (inline_slug, variant, media,), (
+                    media_cls if variant is None or variant in media_variants
+                    else default_cls)
+
+            for variant in media_variants - self._variants:
+                yield (inline_slug, variant, media,), INVALID_VARIANT
+
+
+class LazyInlineRegistryItem(object):
+    # An inline registered by dotted path, imported on its first lookup
+
+    def __init__(self, default_inline_cls, media=None):
+        self.default_inline_cls = default_inline_cls
+        self.media = media
+
+    def load(self):
+        def load_cls(inline_cls):
+            if isinstance(inline_cls, six.string_types):
+                return import_string(inline_cls)
+            return inline_cls
+
+        media = self.media
+
+        if media is not None:
+            media = dict((k, load_cls(v),) for k, v in media.items())
+        return InlineRegistryItem(load_cls(self.default_inline_cls), media)
+
+
+def is_lazy(inline_cls, media=None):
+    return isinstance(inline_cls, six.string_types) or any(
+        isinstance(media_cls, six.string_types)
+        for media_cls in (media or {}).values())
+
 
 class InlineRegistry(object):
 
@@ -47,47 +104,116 @@ class InlineRegistry(object):
 
     def __init__(self):
         self._lock = RLock()
+        # Both are replaced as a whole on every change and never mutated
+        # afterwards, so lookups can read them without taking the lock
         self._registry = {}
+        self._dispatch = {}
+        self.slugs = frozenset()
+        self.version = 0
+
+    def _publish(self, inlines):
+        dispatch = {}
+
+        for inline_slug, iri in inlines.items():
+            if isinstance(iri, LazyInlineRegistryItem):
+                # Found on a miss, which loads it
+                dispatch[(inline_slug,)] = iri
+            else:
+                dispatch.update(iri.get_dispatch_items(inline_slug))
+
+        self._dispatch = dispatch
+        self._registry = inlines
+        self.slugs = frozenset(inlines)
+        self.version += 1
 
     def clear(self):
         with self._lock:
-            self._registry.clear()
+            self._publish({})
 
     def register(self, inline_slugs, inline_cls, media=None):
         if isinstance(inline_slugs, six.string_types):
             inline_slugs = [inline_slugs]
 
         with self._lock:
-            iri = InlineRegistryItem(inline_cls, media)
+            inlines = dict(self._registry)
+            iri = LazyInlineRegistryItem(inline_cls, media) \
+                if is_lazy(inline_cls, media) \
+                else InlineRegistryItem(inline_cls, media)
 
             for inline_slug in inline_slugs:
-                if inline_slug in self._registry:
+                if inline_slug in inlines:
                     raise self.AlreadyRegistered(
                         'Inline `%s` is already registered' % inline_slug)
-                self._registry[inline_slug] = iri
+                inlines[inline_slug] = iri
+
+            self._publish(inlines)
 
     def unregister(self, inline_slugs):
         if isinstance(inline_slugs, six.string_types):
             inline_slugs = [inline_slugs]
 
         with self._lock:
+            inlines = dict(self._registry)
+
             for inline_slug in inline_slugs:
                 try:
-                    del self._registry[inline_slug]
+                    del inlines[inline_slug]
                 except KeyError:
                     raise self.NotRegistered(
                         'Inline `%s` is not registered' % inline_slug)
 
+            self._publish(inlines)
+
     def get_registered_inline(self, inline_slug, variant=None, media=None):
-        try:
-            with self._lock:
-                return self._registry[inline_slug] \
-                    .get_inline_cls(variant=variant, media=media)
-        except KeyError:
-            raise self.NotRegistered(
-                'Inline `%s` is not registered' % inline_slug)
-        except InvalidVariant:
+        dispatch = self._dispatch
+        inline_cls = dispatch.get((inline_slug, variant, media,))
+
+        if inline_cls is None and media is not None:
+            inline_cls = dispatch.get((inline_slug, variant, None,))
+
+        if inline_cls is None or inline_cls is INVALID_VARIANT:
+            if (inline_slug, None, None,) not in dispatch:
+                if (inline_slug,) in dispatch:
+                    self.load(inline_slug)
+                    return self.get_registered_inline(
+                        inline_slug, variant=variant, media=media)
+
+                raise self.NotRegistered(
+                    'Inline `%s` is not registered' % inline_slug)
             raise self.InvalidVariant('Unknown variant `%s`' % variant)
+        return inline_cls
+
+    def load(self, inline_slug):
+        # Imports an inline registered by dotted path, along with the other
+        # slugs it was registered under
+        with self._lock:
+            lazy_iri = self._registry.get(inline_slug)
+
+            if not isinstance(lazy_iri, LazyInlineRegistryItem):
+                return
+
+            iri = lazy_iri.load()
+            inlines = dict(self._registry)
+
+            for slug, slug_iri in self._registry.items():
+                if slug_iri is lazy_iri:
+                    inlines[slug] = iri
+
+            self._publish(inlines)
 
 
 registry = InlineRegistry()
+
+
+def autodiscover():
+    # Registers the inlines of the `INLINE_REGISTRY` setting, which maps
+    # slugs to the dotted path of their inline class, or to a tuple of that
+    # path and a dict of media specific paths. Nothing is imported until an
+    # inline is first looked up.
+    for inline_slug, inline_cls in getattr(
+            settings, 'INLINE_REGISTRY', {}).items():
+        media = None
+
+        if isinstance(inline_cls, (list, tuple,)):
+            inline_cls, media = inline_cls
+        registry.register(inline_slug, inline_cls, media=media)
@@ -1,15 +1,30 @@
+import sys
 import logging
 from itertools import chain
+from multiprocessing.pool import ThreadPool
+from threading import BoundedSemaphore, Lock, local
+from timeit import default_timer
 
 from django.conf import settings
+from django.db import close_old_connections
 
 from django.utils.encoding import force_text
 from django.utils.safestring import mark_safe
+from django.utils import translation
 
 from django.core.exceptions import ValidationError
 
-from .parsing import Parser
-from .errors import InlineValidationError, create_verbose_inline_errors
+from .parsing import Lexer, Parser, InlineNode, is_plain_text
+from .inlines.model_inlines import prefetch_objects
+from .compiling import compiler
+from .breakers import breakers
+from .errors import (
+    InlineSyntaxError, InlineValidationError, create_verbose_inline_errors,)
+
+if sys.version_info >= (3, 5):
+    from .async_rendering import AsyncRendererMixin
+else:
+    AsyncRendererMixin = object
 
 __all__ = ('Renderer', 'renderer',)
 
@@ -17,13 +32,130 @@ __all__ = ('Renderer', 'renderer',)
 logger = logging.getLogger(__name__)
 
 
-class Renderer(object):
+def get_position(fp):
+    # The position to roll `fp` back to, None if it can't seek
+    seekable = getattr(fp, 'seekable', None)
+
+    if seekable is not None and not seekable():
+        return None
+
+    try:
+        return fp.tell()
+    except (AttributeError, IOError, OSError):
+        return None
+
+
+def rollback(fp, position):
+    if position is not None:
+        fp.seek(position)
+        fp.truncate()
+
+
+class Renderer(AsyncRendererMixin):
+
+    def __init__(self, max_workers=None, document_workers=None):
+        self.max_workers = max_workers
+        self.document_workers = document_workers
+        self._pool = None
+        self._pool_size = 0
+        self._pool_lock = Lock()
+        self._local = local()
+
+    def get_max_workers(self):
+        if self.max_workers is not None:
+            return self.max_workers
+        return getattr(settings, 'INLINE_MAX_WORKERS', 1)
+
+    def get_document_workers(self):
+        # The most workers one document renders on at once, all of them by
+        # default
+        if self.document_workers is not None:
+            return self.document_workers
+        return getattr(
+            settings, 'INLINE_DOCUMENT_WORKERS', self.get_max_workers())
+
+    def get_pool(self, workers):
+        # One pool is shared by every document, so the number of threads is
+        # capped across requests too. It's replaced when the number of
+        # workers changes, the old one finishes what it was given first.
+        pool = self._pool
+
+        if pool is not None and self._pool_size == workers:
+            return pool
+
+        with self._pool_lock:
+            if self._pool is None or self._pool_size != workers:
+                if self._pool is not None:
+                    self._pool.close()
+
+                self._pool = ThreadPool(workers, self._init_thread)
+                self._pool_size = workers
+            return self._pool
+
+    def _init_thread(self):
+        self._local.in_pool = True
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+                self._pool_size = 0
 
     def render(self, content, media=None,
                raise_errors=False, log_errors=False, verbose_errors=True):
+        if is_plain_text(content):
+            return mark_safe(content)
+
+        return self._render(
+            Parser(media=media).parse, content, media,
+            raise_errors, log_errors, verbose_errors)
+
+    def render_many(self, contents, media=None,
+                    raise_errors=False, log_errors=False, verbose_errors=True):
+        # Documents share a parser, so inline classes are looked up once, and
+        # inlines that appear more than once across them are rendered once.
+        parser = Parser(media=media)
+        fragments = {}
+        results = []
+
+        for content in contents:
+            if is_plain_text(content):
+                results.append(mark_safe(content))
+            else:
+                results.append(self._render(
+                    parser.parse, content, media,
+                    raise_errors, log_errors, verbose_errors, fragments))
+        return results
+
+    def render_document(self, document, raise_errors=False, log_errors=False,
+                        verbose_errors=True):
+        document.check_stale()
+        return self._render(
+            lambda document: (document.nodes, document.errors,), document,
+            document.media, raise_errors, log_errors, verbose_errors)
+
+    def render_compiled(self, compiled, content, media=None,
+                        raise_errors=False, log_errors=False,
+                        verbose_errors=True):
+        def parse(compiled):
+            parsed = compiler.load(compiled, media=media)
+
+            if parsed is None:
+                # Outdated or invalid, fall back to parsing the source
+                return Parser(media=media).parse(content)
+            return parsed
+
+        return self._render(
+            parse, compiled, media, raise_errors, log_errors, verbose_errors)
+
+    def _render(self, parse, content, media,
+                raise_errors, log_errors, verbose_errors, fragments=None):
         try:
-            nodes, syntax_errors = Parser(media=media).parse(content)
-            content, inline_errors = self.render_nodes(nodes, media)
+            nodes, syntax_errors = parse(content)
+            content, inline_errors = self.render_nodes(
+                nodes, media, fragments)
         except Exception as err:
             if log_errors:
                 logger.exception(err)
@@ -32,38 +164,321 @@ class Renderer(object):
             return u''
 
         if bool(syntax_errors or inline_errors):
-            errors = [
-                ve[1] for ve in sorted(
-                    chain(
-                        ((se.lineno, se) for se in syntax_errors),
-                        ((ie.lineno, ie) for ie in inline_errors)),
-                    key=lambda obj: obj[0])]
+            self.handle_errors(
+                chain(syntax_errors, inline_errors),
+                raise_errors, log_errors, verbose_errors)
+            return u''
+        return mark_safe(content)
 
-            validation_errors = \
-                create_verbose_inline_errors(errors) \
-                if verbose_errors else ValidationError(errors)
+    def validate(self, content, media=None,
+                 raise_errors=True, log_errors=False, verbose_errors=True):
+        # Finds the same errors as `render`, without rendering anything.
+        # Returns whether the content is valid.
+        if is_plain_text(content):
+            return True
 
+        try:
+            nodes, syntax_errors = Parser(media=media).parse(content)
+            inline_errors = self.validate_nodes(nodes)
+        except Exception as err:
             if log_errors:
-                for error_msg in validation_errors.messages:
-                    logger.error(error_msg)
-            if raise_errors:
-                raise validation_errors
-            return u''
-        return mark_safe(content)
+                logger.exception(err)
+            if getattr(settings, 'INLINE_DEBUG', raise_errors):
+                raise
+            return False
+
+        if bool(syntax_errors or inline_errors):
+            self.handle_errors(
+                chain(syntax_errors, inline_errors),
+                raise_errors, log_errors, verbose_errors)
+            return False
+        return True
+
+    def validate_nodes(self, nodes):
+        inlines = self.create_inlines(nodes)
+        prefetch_objects(list(set(
+            inline for inline in inlines if inline is not None)))
 
-    def render_nodes(self, nodes, media):
-        bits = []
         errors = []
-        for node in nodes:
+
+        for node, inline in zip(nodes, inlines):
+            if inline is None:
+                continue
+
             try:
-                bit = node.render(media)
+                node.validate(inline)
             except ValidationError as err:
-                bit = u''
                 errors.extend(
                     (InlineValidationError(node.lineno, msg)
                         for msg in err.messages))
-            bits.append(force_text(bit))
+        return errors
+
+    def render_iter(self, content, media=None,
+                    raise_errors=False, log_errors=False, verbose_errors=True):
+        # Chunks that were already yielded can't be taken back, so nodes with
+        # errors are skipped and the errors are raised or logged at the end.
+        syntax_errors = []
+        inline_errors = []
+
+        try:
+            for bit in self.iter_bits(
+                    content, media, syntax_errors, inline_errors):
+                yield mark_safe(bit)
+        except Exception as err:
+            if log_errors:
+                logger.exception(err)
+            if getattr(settings, 'INLINE_DEBUG', raise_errors):
+                raise
+            return
+
+        if bool(syntax_errors or inline_errors):
+            self.handle_errors(
+                chain(syntax_errors, inline_errors),
+                raise_errors, log_errors, verbose_errors)
+
+    def render_to(self, fp, content, media=None,
+                  raise_errors=False, log_errors=False, verbose_errors=True):
+        # Writes the output of every node to `fp` as soon as it's rendered.
+        # Like `render`, documents with errors output nothing. What was
+        # written already is truncated when `fp` can seek, nothing more is
+        # written after the first error otherwise.
+        if is_plain_text(content):
+            fp.write(content)
+            return
+
+        start = get_position(fp)
+        syntax_errors = []
+        inline_errors = []
+
+        try:
+            for bit in self.iter_bits(
+                    content, media, syntax_errors, inline_errors):
+                if not (syntax_errors or inline_errors):
+                    fp.write(bit)
+        except Exception as err:
+            rollback(fp, start)
+            if log_errors:
+                logger.exception(err)
+            if getattr(settings, 'INLINE_DEBUG', raise_errors):
+                raise
+            return
+
+        if bool(syntax_errors or inline_errors):
+            rollback(fp, start)
+            self.handle_errors(
+                chain(syntax_errors, inline_errors),
+                raise_errors, log_errors, verbose_errors)
+
+    def iter_bits(self, content, media, syntax_errors, inline_errors):
+        # Lexes, parses and renders one token at a time. The errors are kept
+        # apart like in `render`, so they are reported in the same order.
+        fragments = {}
+        parser = Parser(media=media)
+        deadline = self.get_deadline()
+
+        for token in Lexer(content).iter_tokens():
+            try:
+                node = parser.parse_token(token)
+            except InlineSyntaxError as err:
+                syntax_errors.append(err)
+                continue
+
+            bit = self.render_node(
+                node, media, inline_errors, fragments, deadline=deadline)
+
+            if bit:
+                yield bit
+
+    def render_nodes(self, nodes, media, fragments=None):
+        bits = []
+        errors = []
+
+        for bit, node_errors in self.map_nodes(nodes, media, fragments):
+            bits.append(bit)
+            errors.extend(node_errors)
         return u''.join(bits), errors
 
+    def map_nodes(self, nodes, media, fragments=None):
+        # Yields the rendered output and errors of every node, in document
+        # order. With more than one worker, inlines render on the thread pool
+        # of the renderer.
+        if fragments is None:
+            fragments = {}
+
+        items = list(zip(nodes, self.create_inlines(nodes, fragments)))
+
+        # The first occurrence of every inline, the others share its instance
+        # and reuse its fragment
+        seen = set()
+        first = [
+            i for i, (node, inline) in enumerate(items)
+            if inline is not None and
+            not (inline in seen or seen.add(inline))]
+
+        prefetch_objects([items[i][1] for i in first])
+
+        max_workers = self.get_max_workers()
+        workers = min(max_workers, self.get_document_workers(), len(first))
+
+        deadline = self.get_deadline()
+
+        def render(item):
+            errors = []
+            bit = self.render_node(
+                item[0], media, errors, fragments, item[1], deadline)
+            return bit, errors
+
+        # Inlines that render documents themselves render them in their own
+        # thread, waiting on the pool from inside it could deadlock
+        if workers < 2 or getattr(self._local, 'in_pool', False):
+            return map(render, items)
+
+        language = translation.get_language()
+
+        # A document has no more items in the pool at once than it has
+        # workers, so the items of other documents get their turn
+        semaphore = BoundedSemaphore(workers)
+
+        def render_in_thread(item):
+            # Pool threads outlive requests, their connections are closed
+            # like at the start and end of one when they are too old
+            close_old_connections()
+
+            if language is not None:
+                translation.activate(language)
+            try:
+                return render(item)
+            finally:
+                translation.deactivate()
+                close_old_connections()
+                semaphore.release()
+
+        pool = self.get_pool(max_workers)
+        pending = []
+
+        for i in first:
+            semaphore.acquire()
+            pending.append(
+                (i, pool.apply_async(render_in_thread, (items[i],)),))
+
+        results = dict((i, result.get()) for i, result in pending)
+
+        return [
+            results[i] if i in results else render(item)
+            for i, item in enumerate(items)]
+
+    def create_inlines(self, nodes, fragments=None):
+        # Inlines are created before anything renders, so the objects of
+        # model inlines can be fetched in bulk. Identical inlines share one
+        # instance, so they are validated and fetched only once. Nodes with
+        # a rendered fragment already don't get one.
+        inlines = []
+        created = {}
+
+        for node in nodes:
+            if not isinstance(node, InlineNode):
+                inlines.append(None)
+                continue
+
+            key = (node.inline_cls, node.spec,)
+
+            if fragments is not None and key in fragments:
+                inlines.append(None)
+            elif key in created:
+                inlines.append(created[key])
+            else:
+                inlines.append(created.setdefault(key, node.create_inline()))
+        return inlines
+
+    def render_node(self, node, media, errors, fragments=None, inline=None,
+                    deadline=None):
+        try:
+            if not isinstance(node, InlineNode):
+                bit = node.render(media)
+            elif fragments is None:
+                bit, rendered = self.render_inline(
+                    node, media, inline, deadline)
+            else:
+                # Inlines with the same class and spec render the same, only
+                # the first one is rendered. Inlines with errors are never
+                # stored so each reports its own contents and line number.
+                key = (node.inline_cls, node.spec,)
+
+                try:
+                    bit = fragments[key]
+                except KeyError:
+                    bit, rendered = self.render_inline(
+                        node, media, inline, deadline)
+
+                    if rendered:
+                        fragments[key] = bit
+        except ValidationError as err:
+            bit = u''
+            errors.extend(
+                (InlineValidationError(node.lineno, msg)
+                    for msg in err.messages))
+        return force_text(bit)
+
+    def render_inline(self, node, media, inline=None, deadline=None):
+        # Returns the output of the inline and whether it was rendered, or
+        # its fallback used instead because its breaker is open or the
+        # document ran out of time.
+        if node.inline_cls._meta.render_budget is None and \
+                not breakers.enabled():
+            return node.render(media, inline), True
+
+        # Invalid inlines raise their errors whatever state the breaker is in
+        inline = node.validate(inline)
+        breaker = breakers.get(node.inline_cls)
+
+        if not breaker.allow() or (
+                deadline is not None and default_timer() > deadline):
+            return inline.render_fallback(
+                variant=node.variant, media=media), False
+
+        start = default_timer()
+
+        try:
+            bit = node.render(media, inline)
+        except ValidationError:
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+
+        budget = self.get_render_budget(inline)
+
+        if budget is not None and default_timer() - start > budget:
+            breaker.trip()
+        else:
+            breaker.record_success()
+        return bit, True
+
+    def get_render_budget(self, inline):
+        budget = inline._meta.render_budget
+
+        if budget is None:
+            return getattr(settings, 'INLINE_RENDER_BUDGET', None)
+        return budget
+
+    def get_deadline(self):
+        budget = getattr(settings, 'INLINE_DOCUMENT_BUDGET', None)
+
+        if budget is not None:
+            return default_timer() + budget
+
+    def handle_errors(self, errors, raise_errors, log_errors, verbose_errors):
+        errors = sorted(errors, key=lambda error: error.lineno)
+
+        validation_errors = \
+            create_verbose_inline_errors(errors) \
+            if verbose_errors else ValidationError(errors)
+
+        if log_errors:
+            for error_msg in validation_errors.messages:
+                logger.error(error_msg)
+        if raise_errors:
+            raise validation_errors
+
 
 renderer = Renderer()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+
+import os
+import re
+import sys
+import timeit
+import threading
+
+import django
+
+from django.conf import settings
+
+
+sys.path.append(
+    os.path.join(
+        os.path.abspath(os.path.join(os.path.dirname(__file__))), '..'))
+
+
+settings.configure(**{
+    'INLINE_PARSE_CACHE_SIZE': 0,
+    'MIDDLEWARE_CLASSES': (),
+    'INSTALLED_APPS': ('django_inlines', 'test_app',),
+    'DATABASES': {
+        'default': {
+            'NAME': ':memory:',
+            'ENGINE': 'django.db.backends.sqlite3'}}})
+
+
+try:
+    # Django 1.7
+    django.setup()
+except AttributeError:
+    pass
+
+
+from django.utils.text import smart_split, unescape_string_literal
+
+from django_inlines import registry, renderer
+from django_inlines.registry import InlineRegistry
+from django_inlines.parsing import Lexer, Parser, TOKEN_INLINE
+
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+def report(name, number, **timings):
+    print(name)
+    for label, seconds in sorted(timings.items(), key=lambda t: t[1]):
+        print('  %-12s %10.2f usec/call' % (label, seconds / number * 1e6))
+
+
+LEGACY_KWARG_RE = re.compile(r'(?:(\w+)=)?(.+)')
+LEGACY_INLINE_RE = re.compile(r'(\{\{.*?\}\})')
+
+
+def legacy_tokenize(content):
+    in_tag = False
+    lineno = 1
+    result = []
+
+    for bit in LEGACY_INLINE_RE.split(content):
+        if bit:
+            if in_tag:
+                result.append((bit[2:-2].strip(), lineno,))
+            lineno += bit.count('\n')
+        in_tag = not in_tag
+
+    return result
+
+
+def legacy_parse_inline(contents):
+    bits = list(smart_split(contents))
+    args = []
+    kwargs = {}
+    ibits = bits.pop(0).split(':')
+    name, variant = ibits if len(ibits) == 2 else (ibits[0], None,)
+
+    for arg in bits:
+        k, v = LEGACY_KWARG_RE.match(arg).groups()
+        try:
+            v = unescape_string_literal(v)
+        except ValueError:
+            pass
+        if k is None:
+            args.append(v)
+        else:
+            kwargs[k] = v
+    return name, variant, args, kwargs
+
+
+def legacy_pipeline(content):
+    return [legacy_parse_inline(c) for c, _ in legacy_tokenize(content)]
+
+
+def scanner_pipeline(content):
+    parser = Parser()
+    return [
+        parser.parse_inline_token(token)
+        for token in Lexer(content).tokenize()
+        if token.token_type == TOKEN_INLINE]
+
+
+@benchmark
+def bench_scanner(number=200):
+    paragraph = (
+        u'Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n'
+        u'{{ image 1234 }} sed do {{ ad slot=top }} eiusmod tempor\n'
+        u'{{ quote:pull "It was the best of times" author=\'Dickens\' }}\n')
+    content = paragraph * 100
+
+    assert legacy_pipeline(content) == [
+        (spec.name, spec.variant, list(spec.args), dict(spec.kwargs),)
+        for spec in scanner_pipeline(content)]
+
+    report(
+        'Lex and split 300 inlines', number,
+        legacy=timeit.timeit(
+            lambda: legacy_pipeline(content), number=number),
+        scanner=timeit.timeit(
+            lambda: scanner_pipeline(content), number=number))
+
+
+@benchmark
+def bench_plain_text(number=20000):
+    content = u'Lorem ipsum dolor sit amet, consectetur adipiscing. ' * 20
+
+    def full_pipeline():
+        return renderer._render(
+            Parser().parse, content, None, False, False, True)
+
+    assert full_pipeline() == renderer.render(content)
+
+    report(
+        'Render plain text without inlines', number,
+        parsed=timeit.timeit(full_pipeline, number=number),
+        fast_path=timeit.timeit(
+            lambda: renderer.render(content), number=number))
+
+
+@benchmark
+def bench_validate(number=200):
+    from test_app.inlines import BasicInline, MarkdownTemplateInline
+
+    registry.register('echo', BasicInline)
+    registry.register('echo_markdown', MarkdownTemplateInline)
+
+    content = u''.join(
+        u'Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n'
+        u'{{ echo arg%d arg2 kwarg1=kwarg1 }} {{ echo_markdown Hello%d }}\n'
+        u'{{ echo_markdown:upper Hello%d }}\n' % (i, i, i) for i in range(50))
+
+    report(
+        'Validate 150 inlines', number,
+        render=timeit.timeit(
+            lambda: renderer.render(content, raise_errors=True),
+            number=number),
+        validate=timeit.timeit(
+            lambda: renderer.validate(content), number=number))
+
+    registry.clear()
+
+
+class FullParser(Parser):
+
+    def match_unregistered(self, token):
+        return None
+
+
+@benchmark
+def bench_unregistered(number=20):
+    from test_app.inlines import BasicInline
+
+    registry.register('echo', BasicInline)
+
+    # More distinct inlines than the spec cache holds
+    content = u''.join(
+        u'Imported {{ legacy_macro%d some args here }}\n' % i
+        for i in range(2000))
+
+    def parse(parser_cls):
+        return lambda: parser_cls().parse_content(content)
+
+    assert [err.messages for err in parse(Parser)()[1]] == \
+        [err.messages for err in parse(FullParser)()[1]]
+
+    report(
+        'Parse 2000 unregistered inlines', number,
+        full=timeit.timeit(parse(FullParser), number=number),
+        fast_reject=timeit.timeit(parse(Parser), number=number))
+
+    registry.clear()
+
+
+@benchmark
+def bench_reparse(number=200):
+    from test_app.inlines import BasicInline
+
+    registry.register('echo', BasicInline)
+
+    paragraph = (
+        u'Lorem ipsum dolor sit amet, {{ echo a b }} consectetur.\n'
+        u'{{ echo:upper c d }} adipiscing elit, sed do eiusmod.\n')
+    content = paragraph * 2000
+    parser = Parser()
+
+    def reparse(position):
+        # Types a character and takes it back, the document keeps its size
+        state = {'document': parser.parse_document(content)}
+
+        def edit():
+            document = parser.reparse(
+                state['document'], position, position, u'x')
+            state['document'] = parser.reparse(
+                document, position, position + 1, u'')
+        return edit
+
+    report(
+        'Edit a %dKB document' % (len(content) // 1024), number * 2,
+        full=timeit.timeit(
+            lambda: parser.parse_document(content), number=number) * 2,
+        top=timeit.timeit(reparse(10), number=number),
+        bottom=timeit.timeit(reparse(len(content) - 10), number=number))
+
+    registry.clear()
+
+
+class LockedRegistry(InlineRegistry):
+
+    def get_registered_inline(self, inline_slug, variant=None, media=None):
+        with self._lock:
+            return super(LockedRegistry, self).get_registered_inline(
+                inline_slug, variant=variant, media=media)
+
+
+@benchmark
+def bench_registry_threads(number=20000, threads=8):
+    from test_app.inlines import BasicInline
+
+    def lookups(inline_registry):
+        def run():
+            for i in range(number):
+                inline_registry.get_registered_inline('echo', 'upper')
+
+        workers = [threading.Thread(target=run) for i in range(threads)]
+
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    locked = LockedRegistry()
+    snapshot = InlineRegistry()
+
+    for inline_registry in (locked, snapshot,):
+        inline_registry.register('echo', BasicInline)
+
+    report(
+        'Look up an inline from %d threads' % threads, number * threads,
+        locked=timeit.timeit(lambda: lookups(locked), number=1),
+        snapshot=timeit.timeit(lambda: lookups(snapshot), number=1))
+
+
+def main():
+    names = sys.argv[1:]
+    for func in BENCHMARKS:
+        if not names or func.__name__ in names:
+            func()
+
+
+if __name__ == '__main__':
+    main()
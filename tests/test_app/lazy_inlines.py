@@ -0,0 +1,11 @@
+from .inlines import BasicInline, BasicMixInline
+
+__all__ = ('LazyInline', 'LazyMixInline',)
+
+
+class LazyInline(BasicInline):
+    pass
+
+
+class LazyMixInline(BasicMixInline):
+    pass
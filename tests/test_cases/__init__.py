@@ -1,4 +1,7 @@
 from .test_common import *
+from .test_async_rendering import *
+from .test_breakers import *
+from .test_compiling import *
 from .test_forms import *
 from .test_parsing import *
 from .test_registry import *
@@ -0,0 +1,255 @@
+import sys
+import threading
+import unittest
+
+from django.core.exceptions import ValidationError
+from django.db.models.query import QuerySet
+from django.test import TransactionTestCase
+
+from django_inlines import inlines, registry, renderer
+from django_inlines.breakers import breakers
+
+from test_app.models import InlineTestModel
+from test_app.inlines import BasicInline, BasicModelInline
+
+try:
+    import asgiref
+except ImportError:
+    asgiref = None
+
+__all__ = ('AsyncRendererTestCase',)
+
+
+class AsyncInline(BasicInline):
+
+    def afull_render(self, variant=None, media=None):
+        import asyncio
+
+        future = asyncio.Future()
+        future.set_result(u'async %s' % self.full_render(variant, media))
+        return future
+
+
+class FallbackInline(AsyncInline):
+    fallbacks = 0
+
+    def render_fallback(self, variant=None, media=None):
+        FallbackInline.fallbacks += 1
+        return u'Unavailable'
+
+
+class AsyncProcessInline(BasicInline):
+    aprocessed = 0
+
+    def aprocess(self):
+        import asyncio
+
+        AsyncProcessInline.aprocessed += 1
+        self.process()
+        future = asyncio.Future()
+        future.set_result(None)
+        return future
+
+    def process(self):
+        # Only `aprocess` may process the inline
+        self.processed = getattr(self, 'processed', 0) + 1
+        assert self.processed == 1
+        super(AsyncProcessInline, self).process()
+
+
+class RecordingQuerySet(QuerySet):
+    # Records which of the async methods of the queryset were used
+    calls = []
+
+    def aget(self, *args, **kwargs):
+        RecordingQuerySet.calls.append('aget')
+        return super(RecordingQuerySet, self).aget(*args, **kwargs)
+
+    def __aiter__(self):
+        RecordingQuerySet.calls.append('aiter')
+        return super(RecordingQuerySet, self).__aiter__()
+
+
+class AsyncModelInline(BasicModelInline):
+
+    def get_queryset(self):
+        return RecordingQuerySet(InlineTestModel)
+
+    class Meta(object):
+        model = InlineTestModel
+        app_label = 'test_app'
+
+
+class AsyncLookupModelInline(AsyncModelInline):
+    # Looks its object up by two fields, which isn't prefetched
+    text = inlines.CharQueryArgument(keyword=True)
+
+    class Meta(object):
+        model = InlineTestModel
+        app_label = 'test_app'
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'Requires Python 3.5+')
+class AsyncRendererTestCase(TransactionTestCase):
+    # Synchronous fallbacks run in other threads, which don't see the data
+    # of a test wrapped in a transaction
+
+    def tearDown(self):
+        super(AsyncRendererTestCase, self).tearDown()
+        registry.clear()
+        breakers.clear()
+
+    def arender(self, *args, **kwargs):
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+
+        try:
+            return loop.run_until_complete(renderer.arender(*args, **kwargs))
+        finally:
+            loop.close()
+
+    def test_arender(self):
+        registry.register('echo', BasicInline)
+        registry.register('async', AsyncInline)
+
+        content = (
+            u'{{ echo arg1 arg2 }} and {{ echo:upper arg1 arg2 }}\n'
+            u'{{ async arg1 arg2 }}')
+
+        self.assertEqual(
+            u'arg1 arg2 None kwarg2 and ARG1 ARG2 NONE KWARG2\n'
+            u'async arg1 arg2 None kwarg2', self.arender(content))
+        self.assertEqual(u'No inlines', self.arender(u'No inlines'))
+
+    def test_arender_errors(self):
+        registry.register('echo', BasicInline)
+
+        content = (
+            u'{{ echo 1 }}\n{{ }}\n{{ echo arg1 arg2 }}{{ echo a b c }}\n'
+            u'{{ echo 1 }}{{ echo arg1 arg2 }}')
+
+        with self.assertRaises(ValidationError) as cm:
+            renderer.render(content, raise_errors=True)
+
+        with self.assertRaises(ValidationError) as acm:
+            self.arender(content, raise_errors=True)
+
+        self.assertEqual(cm.exception.messages, acm.exception.messages)
+
+    def test_arender_model_inline(self):
+        registry.register('model', BasicModelInline)
+
+        obj = InlineTestModel.objects.create(text='Test')
+
+        self.assertEqual(
+            u'Test TEST', self.arender(
+                u'{{ model %s }} {{ model:upper %s }}' % (obj.pk, obj.pk),
+                raise_errors=True))
+
+        self.assertRaisesMessage(
+            ValidationError,
+            u'Inline `model 1000`:  Object does not exist',
+            self.arender, u'{{ model 1000 }}', None, True)
+
+    @unittest.skipIf(asgiref is not None, 'Uses asgiref instead')
+    def test_arender_connections(self):
+        # The threads synchronous code runs on close their old connections
+        # around every call
+        from django_inlines import async_rendering
+
+        registry.register('model', BasicModelInline)
+        obj = InlineTestModel.objects.create(text='Test')
+        calls = []
+
+        def close_old_connections():
+            calls.append(threading.current_thread())
+
+        self.addCleanup(
+            setattr, async_rendering, 'close_old_connections',
+            async_rendering.close_old_connections)
+        async_rendering.close_old_connections = close_old_connections
+
+        self.assertEqual(
+            u'Test', self.arender(
+                u'{{ model %s }}' % obj.pk, raise_errors=True))
+
+        # Grouping the inlines, fetching their objects and rendering
+        self.assertEqual(6, len(calls))
+        self.assertNotIn(threading.current_thread(), calls)
+
+    def test_arender_open_breaker(self):
+        registry.register('async', AsyncInline)
+        breakers.get(AsyncInline).trip()
+
+        with self.settings(INLINE_BREAKER_THRESHOLD=1):
+            self.assertEqual(
+                u'', self.arender(u'{{ async arg1 arg2 }}', raise_errors=True))
+            self.assertRaisesMessage(
+                ValidationError, u'Takes at least 2 non-keyword arguments',
+                self.arender, u'{{ async arg1 }}', None, True)
+
+    def test_arender_fallbacks(self):
+        # Fallbacks aren't shared with the other occurrences of an inline
+        registry.register('fallback', FallbackInline)
+        breakers.get(FallbackInline).trip()
+        FallbackInline.fallbacks = 0
+
+        with self.settings(INLINE_BREAKER_THRESHOLD=1):
+            self.assertEqual(
+                u'Unavailable Unavailable', self.arender(
+                    u'{{ fallback arg1 arg2 }} {{ fallback arg1 arg2 }}',
+                    raise_errors=True))
+        self.assertEqual(2, FallbackInline.fallbacks)
+
+    def test_aprocess(self):
+        registry.register('aprocess', AsyncProcessInline)
+        AsyncProcessInline.aprocessed = 0
+
+        self.assertEqual(
+            u'arg1 arg2 None kwarg2', self.arender(
+                u'{{ aprocess arg1 arg2 }}', raise_errors=True))
+        self.assertEqual(1, AsyncProcessInline.aprocessed)
+
+        self.assertRaisesMessage(
+            ValidationError, u'Takes at least 2 non-keyword arguments',
+            self.arender, u'{{ aprocess arg1 }}', None, True)
+        self.assertEqual(2, AsyncProcessInline.aprocessed)
+
+    @unittest.skipIf(
+        not hasattr(QuerySet, 'aget'), 'Requires the async ORM')
+    def test_aprefetch_objects(self):
+        registry.register('model', AsyncModelInline)
+        RecordingQuerySet.calls = []
+
+        first = InlineTestModel.objects.create(text='First')
+        second = InlineTestModel.objects.create(text='Second')
+
+        self.assertEqual(
+            u'First SECOND', self.arender(
+                u'{{ model %s }} {{ model:upper %s }}' % (
+                    first.pk, second.pk), raise_errors=True))
+        self.assertEqual(['aiter'], RecordingQuerySet.calls)
+
+        self.assertRaisesMessage(
+            ValidationError,
+            u'Inline `model 1000`:  Object does not exist',
+            self.arender, u'{{ model 1000 }}', None, True)
+
+    @unittest.skipIf(
+        not hasattr(QuerySet, 'aget'), 'Requires the async ORM')
+    def test_aprocess_object(self):
+        registry.register('lookup', AsyncLookupModelInline)
+        RecordingQuerySet.calls = []
+
+        obj = InlineTestModel.objects.create(text='Test')
+
+        self.assertEqual(
+            u'Test', self.arender(
+                u'{{ lookup %s text=Test }}' % obj.pk, raise_errors=True))
+        self.assertEqual(['aget'], RecordingQuerySet.calls)
+
+        self.assertRaisesMessage(
+            ValidationError,
+            u'Inline `lookup %s text=Other`:  Object does not exist' % obj.pk,
+            self.arender, u'{{ lookup %s text=Other }}' % obj.pk, None, True)
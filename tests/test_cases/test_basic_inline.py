@@ -7,7 +7,7 @@ except ImportError:
 
 from django.core.exceptions import ValidationError
 
-from django_inlines import registry, renderer
+from django_inlines import registry, renderer, inlines
 
 from test_app.inlines import BasicInline, BasicInlineParent
 
@@ -79,3 +79,46 @@ class BasicInlineTestCase(InlinesTestCase):
             renderer.render,
             u'{{ echo:downer arg1 arg2 kwarg2=kwarg2 kwarg1=kwarg1 }}',
             None, True)
+
+    def test_variant_renderers(self):
+        self.assertEqual(
+            BasicInline.render_upper, BasicInline._meta.renderers['upper'])
+
+        inline = BasicInline('echo', 'arg1', 'arg2')
+        inline.process()
+
+        self.assertEqual(
+            u'ARG1 ARG2 NONE KWARG2', inline.full_render('upper'))
+
+    def test_undefined_variant(self):
+        def create_inline():
+            class TypoInline(inlines.Inline):
+                def render_upper(self):
+                    return u'UPPER'
+
+                class Meta(object):
+                    app_label = 'test_app'
+                    variants = ('uper',)
+
+        self.assertRaisesMessage(
+            AssertionError,
+            '`TypoInline` variant `uper` has no `render_uper` method',
+            create_inline)
+
+    def test_fallback_variant(self):
+        # `render_fallback` is the fallback of open breakers, not a variant
+        self.assertNotIn('fallback', BasicInline._meta.renderers)
+
+        def create_inline():
+            class FallbackInline(inlines.Inline):
+                def render_fallback(self, variant=None, media=None):
+                    return u'Unavailable'
+
+                class Meta(object):
+                    app_label = 'test_app'
+                    variants = ('fallback',)
+
+        self.assertRaisesMessage(
+            AssertionError,
+            '`FallbackInline` variant `fallback` has no `render_fallback` '
+            'method', create_inline)
@@ -0,0 +1,141 @@
+import time
+
+from django.core.exceptions import ValidationError
+
+from django_inlines import registry, renderer
+from django_inlines.breakers import CircuitBreaker, breakers
+
+from test_app.inlines import BasicInline
+
+from .test_common import InlinesTestCase
+
+__all__ = ('CircuitBreakerTestCase', 'RenderBudgetTestCase',)
+
+
+class SlowInline(BasicInline):
+
+    def _render(self):
+        time.sleep(0.01)
+        return super(SlowInline, self)._render()
+
+
+class BudgetInline(SlowInline):
+
+    def render_fallback(self, variant=None, media=None):
+        return u'Unavailable'
+
+    class Meta(object):
+        render_budget = 0.001
+
+
+class FailingInline(BasicInline):
+
+    def render(self):
+        raise RuntimeError('Backend is down')
+
+
+class CircuitBreakerTestCase(InlinesTestCase):
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(threshold=2, window=60, reset_timeout=60)
+
+        breaker.record_failure()
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+        self.assertTrue(breaker.allow())
+
+        breaker.record_failure()
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+        self.assertFalse(breaker.allow())
+        self.assertEqual(
+            {'state': CircuitBreaker.OPEN, 'trips': 1, 'failures': 0},
+            breaker.stats())
+
+    def test_half_open(self):
+        breaker = CircuitBreaker(threshold=2, window=60, reset_timeout=0)
+
+        breaker.trip()
+        self.assertEqual(CircuitBreaker.HALF_OPEN, breaker.state)
+        self.assertTrue(breaker.allow())
+
+        # A failure while half open opens it again right away
+        breaker.record_failure()
+        self.assertEqual(2, breaker.trips)
+
+        breaker.record_success()
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+
+    def test_window(self):
+        breaker = CircuitBreaker(threshold=2, window=0, reset_timeout=60)
+
+        breaker.record_failure()
+        time.sleep(0.01)
+        breaker.record_failure()
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+
+
+class RenderBudgetTestCase(InlinesTestCase):
+
+    def setUp(self):
+        breakers.clear()
+
+    def tearDown(self):
+        super(RenderBudgetTestCase, self).tearDown()
+        breakers.clear()
+
+    def test_render_budget(self):
+        registry.register('slow', BudgetInline)
+
+        # Over budget, the output is kept but the breaker opens
+        self.assertEqual(
+            u'arg1 arg2 None kwarg2',
+            renderer.render(u'{{ slow arg1 arg2 }}', raise_errors=True))
+        self.assertEqual(
+            u'Unavailable',
+            renderer.render(u'{{ slow arg1 arg2 }}', raise_errors=True))
+
+        self.assertEqual({
+            '%s.BudgetInline' % __name__: {
+                'state': CircuitBreaker.OPEN, 'trips': 1, 'failures': 0}},
+            breakers.stats())
+
+    def test_validation_errors(self):
+        registry.register('slow', BudgetInline)
+        breakers.get(BudgetInline).trip()
+
+        # Open breakers and spent budgets don't hide validation errors
+        self.assertRaisesMessage(
+            ValidationError, u'Takes at least 2 non-keyword arguments',
+            renderer.render, u'{{ slow arg1 }}', None, True)
+
+        with self.settings(INLINE_DOCUMENT_BUDGET=0):
+            self.assertRaisesMessage(
+                ValidationError, u'Takes at least 2 non-keyword arguments',
+                renderer.render, u'{{ slow arg1 }}', None, True)
+            self.assertEqual(
+                u'Unavailable',
+                renderer.render(u'{{ slow arg1 arg2 }}', raise_errors=True))
+
+    def test_failures(self):
+        registry.register('fail', FailingInline)
+
+        with self.settings(INLINE_DEBUG=True, INLINE_BREAKER_THRESHOLD=2):
+            for i in range(2):
+                self.assertRaises(
+                    RuntimeError, renderer.render, u'{{ fail arg1 arg2 }}')
+
+            self.assertEqual(u'', renderer.render(
+                u'{{ fail arg1 arg2 }}', raise_errors=True))
+            self.assertEqual(
+                1, breakers.get(FailingInline).trips)
+
+    def test_document_budget(self):
+        registry.register('slow', SlowInline)
+
+        with self.settings(INLINE_DOCUMENT_BUDGET=0.005):
+            self.assertEqual(
+                u'arg1 arg2 None kwarg2 | ', renderer.render(
+                    u'{{ slow arg1 arg2 }} | {{ slow arg1 hope }}',
+                    raise_errors=True))
+
+        self.assertEqual(
+            CircuitBreaker.CLOSED, breakers.get(SlowInline).state)
@@ -0,0 +1,81 @@
+import json
+
+try:
+    # Python 2
+    from itertools import izip_longest as zip_longest
+except ImportError:
+    # Python 3
+    from itertools import zip_longest
+
+from django.core.exceptions import ValidationError
+
+from django_inlines import compiler, registry, renderer
+
+from test_app.inlines import BasicInline
+
+from .test_common import InlinesTestCase
+
+__all__ = ('CompilerTestCase',)
+
+
+class CompilerTestCase(InlinesTestCase):
+
+    def setUp(self):
+        registry.register('echo', BasicInline)
+
+    def test_compile(self):
+        compiled = compiler.compile(
+            u'Hello\n{{ echo:upper arg1 "arg 2" kwarg1=a }}')
+
+        self.assertEqual({
+            'v': compiler.version,
+            't': ['{{', '}}'],
+            'n': [
+                [1, 'Hello\n'],
+                [2, 'echo:upper arg1 "arg 2" kwarg1=a',
+                 'echo', 'upper', ['arg1', 'arg 2'], {'kwarg1': 'a'}]]},
+            json.loads(compiled))
+
+    def test_render_compiled(self):
+        content = u'Hello {{ echo:upper arg1 arg2 }}'
+        compiled = compiler.compile(content)
+
+        self.assertEqual(
+            renderer.render(content),
+            renderer.render_compiled(compiled, content))
+
+        # Rendered from the compiled data, not from the source
+        self.assertEqual(
+            u'Hello ARG1 ARG2 NONE KWARG2',
+            renderer.render_compiled(compiled, u''))
+
+    def test_render_compiled_errors(self):
+        content = u'{{ }}\n{{ echo2 }}\n{{ echo 1 }}'
+        compiled = compiler.compile(content)
+
+        with self.assertRaises(ValidationError) as cm:
+            renderer.render_compiled(compiled, content, raise_errors=True)
+
+        with self.assertRaises(ValidationError) as expected_cm:
+            renderer.render(content, raise_errors=True)
+
+        for z in zip_longest(
+                expected_cm.exception.messages, cm.exception.messages):
+            self.assertEqual(*z)
+
+    def test_outdated(self):
+        content = u'{{ echo arg1 arg2 }}'
+        data = json.loads(compiler.compile(u'{{ echo:upper arg1 arg2 }}'))
+
+        for key, value in (('v', compiler.version + 1), ('t', ['[[', ']]'])):
+            outdated = dict(data, **{key: value})
+
+            self.assertIsNone(compiler.load(json.dumps(outdated)))
+            self.assertEqual(
+                u'arg1 arg2 None kwarg2',
+                renderer.render_compiled(json.dumps(outdated), content))
+
+        self.assertIsNone(compiler.load(None))
+        self.assertEqual(
+            u'arg1 arg2 None kwarg2',
+            renderer.render_compiled(u'', content))
@@ -1,6 +1,7 @@
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 
-from django_inlines import registry, renderer
+from django_inlines import registry, renderer, inlines
 
 from test_app.models import InlineTestModel
 from test_app.inlines import (
@@ -12,6 +13,31 @@ from .test_common import InlinesTestCase
 __all__ = ('ModelInlineTestCase', 'ModelTemplateInlineTestCase',)
 
 
+class CachedModelInline(BasicModelInline):
+    renders = 0
+
+    def render(self):
+        CachedModelInline.renders += 1
+        return super(CachedModelInline, self).render()
+
+    class Meta(object):
+        cache_timeout = 60
+
+
+class ProcessModelInline(BasicModelInline):
+
+    def process(self):
+        super(ProcessModelInline, self).process()
+        self.add_errors(ValidationError(u'Not allowed'))
+
+
+class ScopedModelInline(BasicModelInline):
+    text = inlines.Argument(keyword=True)
+
+    def get_queryset(self):
+        return InlineTestModel.objects.filter(text=self.data['text'])
+
+
 class ModelInlineTestCase(InlinesTestCase):
 
     def test_model_inline(self):
@@ -56,6 +82,134 @@ class ModelInlineTestCase(InlinesTestCase):
             renderer.render,
             u'{{ model_multiple Test }}', None, True)
 
+    def test_prefetch_objects(self):
+        registry.register('model', BasicModelInline)
+
+        objs = [
+            InlineTestModel.objects.create(text=text)
+            for text in ('One', 'Two', 'Three',)]
+
+        content = u' '.join(
+            u'{{ model %s }} {{ model:upper %s }}' % (obj.pk, obj.pk)
+            for obj in objs)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                u'One ONE Two TWO Three THREE',
+                renderer.render(content, raise_errors=True))
+
+        # Every inline class and field gets its own query
+        registry.register('model_template_inline', BasicModelTemplateInline)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                u'One **Two**', renderer.render(
+                    u'{{ model %s }} {{ model_template_inline %s }}' % (
+                        objs[0].pk, objs[1].pk), raise_errors=True))
+
+    def test_prefetch_process(self):
+        # Overridden `process` methods run, even for inlines that could be
+        # prefetched
+        registry.register('model', ProcessModelInline)
+        obj = InlineTestModel.objects.create(text='Test')
+        content = u'{{ model %s }}' % obj.pk
+
+        self.assertRaisesMessage(
+            ValidationError, u'Not allowed',
+            renderer.render, content, None, True)
+        self.assertRaisesMessage(
+            ValidationError, u'Not allowed', renderer.validate, content)
+
+    def test_prefetch_querysets(self):
+        # Inlines of a class only share the query of the same queryset
+        registry.register('model', ScopedModelInline)
+        obj = InlineTestModel.objects.create(text='One')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(u'One One', renderer.render(
+                u'{{ model %s text=One }} {{ model %s text="One" }}' % (
+                    obj.pk, obj.pk), raise_errors=True))
+
+        self.assertRaisesMessage(
+            ValidationError,
+            u'Inline `model %s text=Two`:  Object does not exist' % obj.pk,
+            renderer.render, u'{{ model %s text=One }} '
+            u'{{ model %s text=Two }}' % (obj.pk, obj.pk), None, True)
+
+    def test_prefetch_errors(self):
+        registry.register('model', BasicModelInline)
+        registry.register('model_multiple', MultipleModelInline)
+
+        obj = InlineTestModel.objects.create(text='Test')
+        InlineTestModel.objects.create(text='Test')
+
+        with self.assertRaises(ValidationError) as cm:
+            renderer.render(
+                u'{{ model %s }}\n{{ model 1000 }}\n'
+                u'{{ model_multiple Test }}\n{{ model 1 2 }}' % obj.pk,
+                raise_errors=True, verbose_errors=False)
+
+        self.assertEqual([
+            u'Inline `model 1000`:  Object does not exist',
+            u'Inline `model_multiple Test`:  Multiple objects returned',
+            u'Inline `model 1 2`:  Takes only 1 non-keyword argument '
+            u'(2 given).'], cm.exception.messages)
+
+    def test_prefetch_strings(self):
+        # Strings are looked up on their own, so that the objects the
+        # database matches by its collation count as multiple objects
+        registry.register('model_multiple', MultipleModelInline)
+
+        for text in ('One', 'Two',):
+            InlineTestModel.objects.create(text=text)
+
+        with self.assertNumQueries(2):
+            self.assertTrue(renderer.validate(
+                u'{{ model_multiple One }} {{ model_multiple Two }}'))
+
+    def test_cached_render(self):
+        registry.register('model', CachedModelInline)
+        CachedModelInline.renders = 0
+        cache.clear()
+
+        obj = InlineTestModel.objects.create(text='Test')
+        content = u'{{ model %s }}' % obj.pk
+
+        for i in range(2):
+            self.assertEqual(
+                u'Test', renderer.render(content, raise_errors=True))
+        self.assertEqual(1, CachedModelInline.renders)
+
+        obj.text = 'Changed'
+        obj.save()
+
+        for i in range(2):
+            self.assertEqual(
+                u'Changed', renderer.render(content, raise_errors=True))
+        self.assertEqual(2, CachedModelInline.renders)
+
+        obj.delete()
+
+        self.assertRaisesMessage(
+            ValidationError,
+            u'Inline `%s`:  Object does not exist' % content[3:-3],
+            renderer.render, content, None, True)
+
+    def test_validate(self):
+        registry.register('model', BasicModelInline)
+        registry.register('model_multiple', MultipleModelInline)
+
+        obj = InlineTestModel.objects.create(text='Test')
+
+        with self.assertNumQueries(1):
+            self.assertTrue(renderer.validate(
+                u'{{ model %s }} {{ model:upper %s }}' % (obj.pk, obj.pk)))
+
+        self.assertRaisesMessage(
+            ValidationError,
+            u'Inline `model 1000`:  Object does not exist',
+            renderer.validate, u'{{ model 1000 }}')
+
     def test_blank_model_inline(self):
         with self.assertRaises(ValueError) as cm:
             BlankModelInline('blank')
@@ -1,14 +1,20 @@
+import random
+
 from django.test import TestCase
 
-from django_inlines import registry
-from django_inlines.parsing import Lexer, Parser
+from django_inlines import registry, renderer
+from django_inlines.utils import LRUCache
+from django_inlines.parsing import (
+    Lexer, Parser, InlineSpec, parse_cache, spec_cache,)
 from django_inlines.errors import InlineSyntaxError
 
 from test_app.inlines import *
 
 from .test_common import InlinesTestCase
 
-__all__ = ('LexerTestCase', 'ParserTestCase',)
+__all__ = (
+    'LexerTestCase', 'ParserTestCase', 'ParseCacheTestCase',
+    'ReparseTestCase',)
 
 
 class LexerTestCase(TestCase):
@@ -42,6 +48,37 @@ class LexerTestCase(TestCase):
         self.assertEqual(1, t2.lineno)
         self.assertEqual(2, t3.lineno)
 
+    def test_lazy_line_numbers(self):
+        lexer = Lexer('text\n\n{{ test }}\n{{ test arg1 }}\n')
+        tokens = lexer.tokenize()
+
+        self.assertEqual([0, 6, 16, 17, 32], [t.position for t in tokens])
+        self.assertIsNone(lexer.line_index._newlines)
+        self.assertEqual([1, 3, 3, 4, 4], [t.lineno for t in tokens])
+
+    def test_lexer_tag_boundaries(self):
+        # Inlines may not span lines
+        tokens = Lexer('{{ test\n{{ test arg }} }}').tokenize()
+
+        self.assertEqual(
+            ['{{ test\n', 'test arg', ' }}'],
+            [token.contents for token in tokens])
+        self.assertEqual([1, 2, 2], [token.lineno for token in tokens])
+
+        # The first end tag closes the inline
+        tokens = Lexer('{{ {{ test }} }}}').tokenize()
+
+        self.assertEqual(
+            ['{{ test', ' }}}'], [token.contents for token in tokens])
+
+    def test_split_contents(self):
+        tokens = Lexer(
+            '{{ test:variant "a b" c\'d e\' kw="f \\"g\\"" k= }}').tokenize()
+
+        self.assertEqual(
+            ['test:variant', '"a b"', "c'd e'", 'kw="f \\"g\\""', 'k='],
+            tokens[0].split_contents())
+
 
 class ParserTestCase(InlinesTestCase):
 
@@ -53,6 +90,63 @@ class ParserTestCase(InlinesTestCase):
 
         self.assertFalse(bool(errors))
 
+    def test_parse_inline_token(self):
+        token = Lexer(
+            '{{ echo:upper "a b" c\'d e\' k= kw="f \\"g\\"" }}').tokenize()[0]
+
+        self.assertEqual(
+            ('echo', 'upper', ('a b', "c'd e'", 'k=',), (('kw', 'f "g"',),),),
+            Parser().parse_inline_token(token))
+
+    def test_spec_cache(self):
+        spec_cache.clear()
+
+        t1, _, t2 = Lexer('{{ echo a kw=1 }} {{ echo a kw=1 }}').tokenize()
+
+        spec = Parser().parse_inline_token(t1)
+
+        self.assertIs(spec, Parser().parse_inline_token(t2))
+        self.assertEqual(1, spec_cache.hits)
+        self.assertIsInstance(spec, InlineSpec)
+        self.assertIsInstance(spec.args, tuple)
+        self.assertIsInstance(spec.kwargs, tuple)
+
+    def test_unregistered_names(self):
+        spec_cache.clear()
+        parser = Parser()
+
+        for contents, name in (
+                ('junk', 'junk',),
+                ('junk:variant with "args"', 'junk',),
+                ('echo:upper hi', None,),
+                ('"junk" x', None,),
+                ('junk x kw=1', None,),):
+            token = Lexer('{{ %s }}' % contents).tokenize()[0]
+
+            self.assertEqual(name, parser.match_unregistered(token))
+
+        # Errors in the arguments are still reported first
+        self.assertEqual([
+            u'Inline `junk kw=1 x`, non-keyword argument found after '
+            u'keyword argument.',
+            u'Inline `junk` is not registered.'], [
+                error.messages[0] for error in Parser().parse(
+                    '{{ junk kw=1 x }}{{ junk x }}')[1]])
+        self.assertEqual(0, len(spec_cache))
+
+    def test_compact_nodes(self):
+        nodes, _ = Parser().parse('Hello {{ echo:upper hi }}')
+        text_node, inline_node = nodes
+
+        for obj in (text_node, text_node.token, inline_node):
+            self.assertFalse(hasattr(obj, '__dict__'))
+
+        self.assertIsNone(text_node.token._contents)
+        self.assertEqual('Hello ', text_node.render())
+        self.assertEqual('echo:upper hi', inline_node.contents)
+        self.assertEqual('upper', inline_node.variant)
+        self.assertIsInstance(inline_node.create_inline(), BasicInline)
+
     def test_syntax_errors(self):
         _, errors = Parser().parse('{{ }}')
 
@@ -81,3 +175,198 @@ class ParserTestCase(InlinesTestCase):
             '{{ }}{{ echo2 }}{{ echo kwarg1=1 arg1 }}')
 
         self.assertEqual(3, len(errors))
+
+
+class ParseCacheTestCase(InlinesTestCase):
+
+    def setUp(self):
+        parse_cache.clear()
+        registry.register('echo', BasicInline)
+
+    def test_cache_hit(self):
+        nodes, _ = Parser().parse('{{ echo hi }} text')
+        cached_nodes, _ = Parser().parse('{{ echo hi }} text')
+
+        self.assertEqual(1, parse_cache.hits)
+        self.assertEqual(1, parse_cache.misses)
+
+        for node, cached_node in zip(nodes, cached_nodes):
+            self.assertIs(node, cached_node)
+
+        # Callers get their own list and can't alter the cached result
+        cached_nodes.pop()
+        self.assertEqual(2, len(Parser().parse('{{ echo hi }} text')[0]))
+
+    def test_cache_key(self):
+        Parser().parse('{{ echo hi }}')
+        Parser(media='media').parse('{{ echo hi }}')
+        Parser().parse('{{ echo bye }}')
+
+        self.assertEqual(0, parse_cache.hits)
+        self.assertEqual(3, parse_cache.misses)
+
+    def test_registry_change(self):
+        _, errors = Parser().parse('{{ echo2 hi }}')
+        self.assertEqual(1, len(errors))
+
+        registry.register('echo2', BasicInline)
+
+        _, errors = Parser().parse('{{ echo2 hi }}')
+        self.assertEqual(0, len(errors))
+        self.assertEqual(0, parse_cache.hits)
+
+    def test_lru_eviction(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+
+        self.assertEqual(1, cache.get('a'))
+
+        cache.set('c', 3)
+
+        self.assertIn('a', cache)
+        self.assertIn('c', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(
+            {'hits': 1, 'misses': 0, 'size': 2, 'maxsize': 2}, cache.stats())
+
+
+class ReparseTestCase(InlinesTestCase):
+
+    content = (
+        u'Intro {{ echo a b }}\n'
+        u'{{ echo2 }} middle {{ echo:upper c d }}\n'
+        u'\n'
+        u'{{ echo e f }} outro\n')
+
+    def setUp(self):
+        registry.register('echo', BasicInline)
+
+    def assertReparsed(self, document, start, end, text):
+        parser = Parser()
+        reparsed = parser.reparse(document, start, end, text)
+        expected = parser.parse_document(reparsed.content)
+
+        self.assertEqual(expected.content, reparsed.content)
+        self.assertEqual(
+            [(t.token_type, t.contents, t.position, t.lineno)
+             for t in expected.tokens],
+            [(t.token_type, t.contents, t.position, t.lineno)
+             for t in reparsed.tokens])
+        self.assertEqual(
+            [(n.__class__, n.contents, n.lineno) for n in expected.nodes],
+            [(n.__class__, n.contents, n.lineno) for n in reparsed.nodes])
+        self.assertEqual(
+            [(e.lineno, e.messages) for e in expected.errors],
+            [(e.lineno, e.messages) for e in reparsed.errors])
+
+        return reparsed
+
+    def test_reparse(self):
+        parse = Parser().parse_document
+        document = parse(self.content)
+        nodes = document.nodes
+
+        # Typing in the last line leaves the nodes before it alone
+        reparsed = self.assertReparsed(document, 70, 70, u'{{ echo g h }}')
+
+        self.assertEqual(nodes[:5], reparsed.nodes[:5])
+
+        # An added line moves the nodes after it down
+        document = parse(self.content)
+        nodes = document.nodes
+        linenos = [n.lineno for n in nodes]
+        reparsed = self.assertReparsed(document, 0, 0, u'{{ echo2 }}\n')
+
+        self.assertEqual(
+            [lineno + 1 for lineno in linenos[1:]],
+            [n.lineno for n in reparsed.nodes[1:]])
+        self.assertIs(nodes[-2].spec, reparsed.nodes[-2].spec)
+
+        # Closing an inline and breaking one up
+        for start, end, text in (
+                (2, 3, u'{{ echo x y }}'), (17, 18, u''), (20, 21, u''),
+                (21, 22, u''),):
+            self.assertReparsed(parse(self.content), start, end, text)
+
+    def test_reparse_reuse(self):
+        document = Parser().parse_document(self.content * 200)
+        tokens = document.tokens
+        nodes = document.nodes
+        linenos = [n.lineno for n in nodes]
+
+        # The tokens and nodes after the edit aren't created again, only
+        # the text it was made in is
+        reparsed = self.assertReparsed(document, 6, 6, u'x\n')
+
+        self.assertEqual(len(tokens), len(reparsed.tokens))
+        self.assertIsNot(tokens[0], reparsed.tokens[0])
+
+        for old, new in zip(tokens[1:], reparsed.tokens[1:]):
+            self.assertIs(old, new)
+        for old, new in zip(nodes[1:], reparsed.nodes[1:]):
+            self.assertIs(old, new)
+
+        self.assertEqual(
+            [lineno + 1 for lineno in linenos[1:]],
+            [n.lineno for n in reparsed.nodes[1:]])
+
+        # The document that was reparsed shares them, so it's parsed from
+        # scratch if it's reparsed again
+        self.assertTrue(document.stale)
+        self.assertReparsed(document, 6, 6, u'y')
+
+    def test_reparse_stale(self):
+        parser = Parser()
+        document = parser.parse_document(u'Hello world {{ echo a arg2 }}')
+        reparsed = parser.reparse(document, 0, 5, u'Goodbye')
+
+        self.assertEqual(
+            u'Goodbye world a arg2 None kwarg2',
+            renderer.render_document(reparsed))
+
+        # The document that was reparsed can't render the new content
+        self.assertRaises(ValueError, renderer.render_document, document)
+        self.assertRaises(ValueError, lambda: document.nodes)
+        self.assertRaises(ValueError, lambda: document.errors)
+
+    def test_reparse_failure(self):
+        # Documents are left alone when parsing the edit fails
+        parser = Parser()
+        document = parser.parse_document(u'Hello world {{ echo a arg2 }}')
+
+        def parse_result(token):
+            raise RuntimeError
+
+        parser.parse_result = parse_result
+
+        with self.assertRaises(RuntimeError):
+            parser.reparse(document, 12, 12, u'{{ echo b arg2 }} ')
+
+        self.assertFalse(document.stale)
+        self.assertEqual(
+            u'Hello world a arg2 None kwarg2',
+            renderer.render_document(document))
+
+    def test_random_edits(self):
+        rand = random.Random(0)
+
+        # The longer content is lexed into more than one segment
+        for content in (self.content, self.content * 10,):
+            document = Parser().parse_document(content)
+
+            for i in range(200):
+                start = rand.randint(0, len(document.content))
+                end = rand.randint(
+                    start, min(start + 5, len(document.content)))
+                text = u''.join(
+                    rand.choice(u'{} \necho')
+                    for i in range(rand.randint(0, 4)))
+                document = self.assertReparsed(document, start, end, text)
+
+    def test_render_document(self):
+        document = Parser().reparse(
+            Parser().parse_document(u'{{ echo a arg2 }}'), 8, 9, u'c')
+
+        self.assertEqual(
+            u'c arg2 None kwarg2', renderer.render_document(document))
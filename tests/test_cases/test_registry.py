@@ -1,4 +1,7 @@
-from django_inlines import registry
+import sys
+
+from django_inlines import registry, autodiscover
+from django_inlines.registry import InlineRegistryItem, InvalidVariant
 
 from test_app.inlines import BasicInline, BasicMixInline
 
@@ -7,6 +10,14 @@ from .test_common import InlinesTestCase
 __all__ = ('InlineRegisteryTestCase',)
 
 
+class MediaInline(BasicMixInline):
+    def render_media(self):
+        return self._render()
+
+    class Meta(object):
+        variants = ('upper', 'media',)
+
+
 class InlineRegisteryTestCase(InlinesTestCase):
 
     def test_registration(self):
@@ -48,6 +59,80 @@ class InlineRegisteryTestCase(InlinesTestCase):
         registry.register(
             'echo', BasicInline, media={'media': BasicMixInline})
 
+    def test_atomic_changes(self):
+        registry.register('echo1', BasicInline)
+        version = registry.version
+
+        with self.assertRaises(registry.AlreadyRegistered):
+            registry.register(('echo', 'echo1',), BasicInline)
+
+        with self.assertRaises(registry.NotRegistered):
+            registry.unregister(('echo1', 'echo',))
+
+        self.__test_inlines_not_registered(('echo',))
+        self.assertEqual(
+            BasicInline, registry.get_registered_inline('echo1'))
+        self.assertEqual(version, registry.version)
+
+    def test_dispatch(self):
+        media = {'media': MediaInline}
+        iri = InlineRegistryItem(BasicInline, media)
+        registry.register('echo', BasicInline, media=media)
+
+        for variant in (None, 'upper', 'mix', 'media', 'nope',):
+            for media in (None, 'media', 'other',):
+                try:
+                    expected = iri.get_inline_cls(variant, media)
+                except InvalidVariant:
+                    with self.assertRaises(registry.InvalidVariant):
+                        registry.get_registered_inline('echo', variant, media)
+                else:
+                    self.assertEqual(
+                        expected, registry.get_registered_inline(
+                            'echo', variant, media))
+
+    def test_lazy_registration(self):
+        sys.modules.pop('test_app.lazy_inlines', None)
+
+        registry.register(
+            ('lazy', 'lazy1',), 'test_app.lazy_inlines.LazyInline',
+            media={'media': 'test_app.lazy_inlines.LazyMixInline'})
+        self.assertNotIn('test_app.lazy_inlines', sys.modules)
+
+        with self.assertRaises(registry.AlreadyRegistered):
+            registry.register('lazy', BasicInline)
+
+        from test_app.lazy_inlines import LazyInline, LazyMixInline
+
+        self.assertEqual(
+            LazyMixInline,
+            registry.get_registered_inline('lazy', 'upper', 'media'))
+        self.assertEqual(LazyInline, registry.get_registered_inline('lazy1'))
+
+        with self.assertRaises(registry.InvalidVariant):
+            registry.get_registered_inline('lazy', 'nope')
+
+        registry.unregister('lazy')
+        self.__test_inlines_not_registered(('lazy',))
+
+    def test_autodiscover(self):
+        with self.settings(INLINE_REGISTRY={
+                'echo': 'test_app.inlines.BasicInline',
+                'echo_media': (
+                    'test_app.inlines.BasicInline',
+                    {'media': 'test_app.inlines.BasicMixInline'},)}):
+            autodiscover()
+
+        self.assertEqual(BasicInline, registry.get_registered_inline('echo'))
+        self.assertEqual(
+            BasicMixInline,
+            registry.get_registered_inline('echo_media', media='media'))
+
+        registry.register('missing', 'test_app.inlines.MissingInline')
+
+        with self.assertRaises(ImportError):
+            registry.get_registered_inline('missing')
+
     def test_not_registered(self):
         with self.assertRaises(registry.NotRegistered):
             registry.get_registered_inline('echo')
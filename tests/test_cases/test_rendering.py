@@ -5,9 +5,16 @@ except ImportError:
     # Python 3
     from itertools import zip_longest
 
+import io
+import time
+import threading
+
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.utils.safestring import SafeData
 
-from django_inlines import registry, renderer
+from django_inlines import registry, renderer, Renderer, rendering
+from django_inlines.parsing import parse_cache
 
 from test_app.inlines import (
     BasicInline, BasicMixInline, BasicInlineParent,)
@@ -17,6 +24,61 @@ from .test_common import InlinesTestCase
 __all__ = ('RendererTestCase',)
 
 
+class CountingInline(BasicInline):
+    renders = 0
+
+    def render(self):
+        CountingInline.renders += 1
+        return super(CountingInline, self).render()
+
+
+class CachedInline(BasicInline):
+    renders = 0
+
+    def _render(self):
+        CachedInline.renders += 1
+        return super(CachedInline, self)._render()
+
+    class Meta(object):
+        cache_timeout = 60
+        cache_vary_on = ('arg1', 'arg2',)
+
+
+class ThreadInline(BasicInline):
+    threads = set()
+
+    def _render(self):
+        ThreadInline.threads.add(threading.current_thread())
+        return super(ThreadInline, self)._render()
+
+
+class ConcurrentInline(BasicInline):
+    lock = threading.Lock()
+    active = 0
+    most_active = 0
+
+    def _render(self):
+        cls = ConcurrentInline
+
+        with cls.lock:
+            cls.active += 1
+            cls.most_active = max(cls.most_active, cls.active)
+        time.sleep(0.01)
+        with cls.lock:
+            cls.active -= 1
+        return super(ConcurrentInline, self)._render()
+
+
+class NestingInline(BasicInline):
+    renderer = None
+
+    def _render(self):
+        return NestingInline.renderer.render(
+            u'{{ thread %(arg1)s %(arg2)s }} '
+            u'{{ thread %(arg1)s %(arg2)s kwarg1=1 }}' % self.data,
+            raise_errors=True)
+
+
 class RendererTestCase(InlinesTestCase):
 
     def setUp(self):
@@ -90,6 +152,299 @@ class RendererTestCase(InlinesTestCase):
             u'Inline `echo arg1 arg2 kwarg3=rebel`, argument `kwarg3`: Is a '
             u'part of the Rebel Alliance and a traitor!'], cm)
 
+    def test_plain_text(self):
+        parse_cache.clear()
+
+        content = renderer.render(u'No inlines')
+
+        self.assertEqual(u'No inlines', content)
+        self.assertIsInstance(content, SafeData)
+        self.assertEqual(0, parse_cache.misses)
+
+    def test_cached_render(self):
+        registry.register('cached', CachedInline)
+        CachedInline.renders = 0
+        cache.clear()
+
+        for i in range(2):
+            self.assertEqual(
+                u'arg1 arg2 None kwarg2', renderer.render(
+                    u'{{ cached arg1 arg2 }}', raise_errors=True))
+        self.assertEqual(1, CachedInline.renders)
+
+        # Keyword arguments aren't in `cache_vary_on`
+        self.assertEqual(
+            u'arg1 arg2 None kwarg2', renderer.render(
+                u'{{ cached arg1 arg2 kwarg1=kwarg1 }}', raise_errors=True))
+        self.assertEqual(1, CachedInline.renders)
+
+        for content in (
+                u'{{ cached arg1 hope }}', u'{{ cached:upper arg1 arg2 }}'):
+            renderer.render(content, raise_errors=True)
+            renderer.render(content, raise_errors=True)
+        self.assertEqual(3, CachedInline.renders)
+
+        renderer.render(u'{{ cached arg1 arg2 }}', media='amp')
+        self.assertEqual(4, CachedInline.renders)
+
+        # Invalid inlines are never cached
+        with self.assertRaises(ValidationError):
+            renderer.render(u'{{ cached arg1 }}', raise_errors=True)
+
+    def test_concurrent_render(self):
+        registry.register('thread', ThreadInline)
+        ThreadInline.threads = set()
+
+        content = u'\n'.join(
+            u'{{ thread %d arg2 }} %d' % (i, i) for i in range(20))
+
+        expected = renderer.render(content, raise_errors=True)
+        self.assertEqual(
+            set((threading.current_thread(),)), ThreadInline.threads)
+
+        ThreadInline.threads = set()
+        threaded = Renderer(max_workers=4)
+        self.addCleanup(threaded.close)
+
+        self.assertEqual(
+            expected, threaded.render(content, raise_errors=True))
+        self.assertNotIn(threading.current_thread(), ThreadInline.threads)
+
+        # The pool and its threads are kept for the next documents
+        pool = threaded._pool
+
+        self.assertEqual(
+            expected, threaded.render(content, raise_errors=True))
+        self.assertIs(pool, threaded._pool)
+        self.assertLessEqual(len(ThreadInline.threads), 4)
+
+        with self.assertRaises(ValidationError) as cm:
+            threaded.render(
+                u'{{ thread 1 }}\n{{ thread 2 arg2 }}\n{{ thread 3 4 5 }}\n'
+                u'{{ thread 6 }}', raise_errors=True, verbose_errors=False)
+
+        self.assertEqual([1, 3, 4], [
+            error.lineno for error in cm.exception.error_list])
+
+        threaded.close()
+        self.assertIsNone(threaded._pool)
+
+    def test_document_workers(self):
+        registry.register('concurrent', ConcurrentInline)
+        content = u' '.join(
+            u'{{ concurrent %d arg2 }}' % i for i in range(8))
+
+        for document_workers, settings in (
+                (2, {},), (None, {'INLINE_DOCUMENT_WORKERS': 2},),):
+            threaded = Renderer(
+                max_workers=4, document_workers=document_workers)
+            self.addCleanup(threaded.close)
+            ConcurrentInline.most_active = 0
+
+            with self.settings(**settings):
+                threaded.render(content, raise_errors=True)
+            self.assertEqual(2, ConcurrentInline.most_active)
+
+    def test_concurrent_connections(self):
+        # Pool threads close their old connections around every inline
+        registry.register('thread', ThreadInline)
+        calls = []
+
+        def close_old_connections():
+            calls.append(threading.current_thread())
+
+        self.addCleanup(
+            setattr, rendering, 'close_old_connections',
+            rendering.close_old_connections)
+        rendering.close_old_connections = close_old_connections
+
+        threaded = Renderer(max_workers=2)
+        self.addCleanup(threaded.close)
+        threaded.render(
+            u'{{ thread 1 arg2 }} {{ thread 2 arg2 }} {{ thread 3 arg2 }}',
+            raise_errors=True)
+
+        self.assertEqual(6, len(calls))
+        self.assertNotIn(threading.current_thread(), calls)
+
+    def test_nested_concurrent_render(self):
+        # Inlines rendering documents on the pool they run on don't wait for
+        # threads that are all busy
+        registry.register('thread', ThreadInline)
+        registry.register('nesting', NestingInline)
+
+        NestingInline.renderer = Renderer(max_workers=2)
+        self.addCleanup(NestingInline.renderer.close)
+
+        self.assertEqual(
+            u' '.join(
+                u'%d arg2 None kwarg2 %d arg2 1 kwarg2' % (i, i)
+                for i in range(4)),
+            NestingInline.renderer.render(u' '.join(
+                u'{{ nesting %d arg2 }}' % i for i in range(4)),
+                raise_errors=True))
+
+    def test_duplicate_inlines(self):
+        registry.register('count', CountingInline)
+
+        for max_workers in (1, 4,):
+            CountingInline.renders = 0
+            counting = Renderer(max_workers=max_workers)
+            self.addCleanup(counting.close)
+
+            self.assertEqual(
+                u'arg1 arg2 None kwarg2\narg1 arg2 None kwarg2 '
+                u'arg1 arg2 None kwarg2', counting.render(
+                        u'{{ count arg1 arg2 }}\n{{ count arg1 arg2 }} '
+                        u'{{ count  arg1  "arg2" }}'))
+            self.assertEqual(1, CountingInline.renders)
+
+            # Every occurrence reports its own errors
+            with self.assertRaises(ValidationError) as cm:
+                counting.render(
+                    u'{{ count arg1 arg2 }}\n{{ count arg1 }}\n'
+                    u'{{ count arg1 arg2 }} {{ count arg1 }}',
+                    raise_errors=True, verbose_errors=False)
+
+            self._test_validation_messages([
+                u'Inline `count arg1`:  Takes at least 2 non-keyword '
+                u'arguments (1 given).'] * 2, cm)
+            self.assertEqual([2, 3], [
+                error.lineno for error in cm.exception.error_list])
+
+    def test_render_to(self):
+        content = u'{{ echo arg1 arg2 }}\nText {{ echo:upper arg1 arg2 }}'
+        fp = io.StringIO()
+        fp.write(u'Start ')
+
+        renderer.render_to(fp, content, raise_errors=True)
+        renderer.render_to(fp, u' No inlines')
+
+        self.assertEqual(
+            u'Start %s No inlines' % renderer.render(content), fp.getvalue())
+
+        # Output of documents with errors is rolled back
+        with self.assertRaises(ValidationError):
+            renderer.render_to(
+                fp, u'{{ echo arg1 arg2 }} {{ echo 1 }}', raise_errors=True)
+
+        renderer.render_to(fp, u'{{ echo arg1 arg2 }} {{ echo 1 }}')
+
+        self.assertEqual(
+            u'Start %s No inlines' % renderer.render(content), fp.getvalue())
+
+        # Errors are reported in the same order as by `render`, syntax
+        # errors first on the same line
+        content = u'{{ echo x }}{{ }}\n{{ nope }}{{ echo y }}'
+
+        with self.assertRaises(ValidationError) as cm:
+            renderer.render(content, raise_errors=True)
+
+        with self.assertRaises(ValidationError) as to_cm:
+            renderer.render_to(io.StringIO(), content, raise_errors=True)
+
+        with self.assertRaises(ValidationError) as iter_cm:
+            list(renderer.render_iter(content, raise_errors=True))
+
+        self.assertEqual(cm.exception.messages, to_cm.exception.messages)
+        self.assertEqual(cm.exception.messages, iter_cm.exception.messages)
+        self.assertIn(u'Syntax error on line 1', cm.exception.messages[0])
+
+    def test_render_to_stream(self):
+        class Stream(object):
+            def __init__(self):
+                self.bits = []
+
+            def write(self, bit):
+                self.bits.append(bit)
+
+        fp = Stream()
+        renderer.render_to(
+            fp, u'{{ echo arg1 arg2 }} {{ echo 1 }} {{ echo arg1 arg2 }}')
+
+        # Nothing is written after the first error
+        self.assertEqual([u'arg1 arg2 None kwarg2', u' '], fp.bits)
+
+    def test_validate(self):
+        registry.register('count', CountingInline)
+        CountingInline.renders = 0
+
+        self.assertTrue(renderer.validate(
+            u'{{ count arg1 arg2 }} {{ count:upper a b kwarg1=c }}'))
+        self.assertTrue(renderer.validate(u'No inlines'))
+        self.assertFalse(renderer.validate(
+            u'{{ count arg1 }}', raise_errors=False))
+        self.assertEqual(0, CountingInline.renders)
+
+        content = (
+            u'{{ }}\n{{ echo hope arg2 }}\n{{ count a b c }}\n'
+            u'{{ count arg1 arg2 kwarg3=rebel }}{{ nope }}')
+
+        with self.assertRaises(ValidationError) as cm:
+            renderer.render(content, raise_errors=True)
+
+        with self.assertRaises(ValidationError) as validate_cm:
+            renderer.validate(content)
+
+        self.assertEqual(
+            cm.exception.messages, validate_cm.exception.messages)
+        self.assertEqual(0, CountingInline.renders)
+
+    def test_render_many(self):
+        registry.register('count', CountingInline)
+        CountingInline.renders = 0
+
+        self.assertEqual([
+            u'arg1 arg2 None kwarg2',
+            u'No inlines',
+            u'arg1 arg2 None kwarg2 arg1 arg2 None kwarg2',
+            u'',
+            u'arg1 arg2 kwarg1 kwarg2'], renderer.render_many([
+                u'{{ count arg1 arg2 }}',
+                u'No inlines',
+                u'{{ count arg1 arg2 }} {{ count  arg1 "arg2" }}',
+                u'{{ count arg1 }}',
+                u'{{ count arg1 arg2 kwarg1=kwarg1 }}']))
+
+        self.assertEqual(2, CountingInline.renders)
+
+        with self.assertRaises(ValidationError) as cm:
+            renderer.render_many([
+                u'{{ count arg1 arg2 }}',
+                u'\n{{ count arg1 }}',
+                u'{{ count 1 }}'], raise_errors=True, verbose_errors=False)
+
+        self._test_validation_messages([
+            u'Inline `count arg1`:  Takes at least 2 non-keyword arguments '
+            u'(1 given).'], cm)
+        self.assertEqual(2, cm.exception.error_list[0].lineno)
+
+    def test_render_iter(self):
+        chunks = renderer.render_iter(
+            u'Hello {{ echo arg1 arg2 }} {{ echo:upper arg1 arg2 }}')
+
+        self.assertEqual(
+            [u'Hello ', u'arg1 arg2 None kwarg2', u' ',
+             u'ARG1 ARG2 NONE KWARG2'], list(chunks))
+
+        chunks = renderer.render_iter(
+            u'Hello {{ echo2 }}\n{{ echo arg1 arg2 }}{{ echo 1 }}',
+            raise_errors=True, verbose_errors=False)
+
+        self.assertEqual(u'Hello ', next(chunks))
+        self.assertEqual(u'\n', next(chunks))
+        self.assertEqual(u'arg1 arg2 None kwarg2', next(chunks))
+
+        with self.assertRaises(ValidationError) as cm:
+            next(chunks)
+
+        self._test_validation_messages([
+            u'Inline `echo2` is not registered.',
+            u'Inline `echo 1`:  Takes at least 2 non-keyword arguments '
+            u'(1 given).'], cm)
+
+        self.assertEqual([], list(renderer.render_iter(u'{{ echo }}')))
+
     def _test_validation_messages(self, expected, cm):
         for z in zip_longest(expected, cm.exception.messages):
             self.assertEqual(*z)
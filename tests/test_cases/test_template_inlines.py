@@ -2,6 +2,8 @@ from django.conf import settings
 from django.template.base import TemplateDoesNotExist
 
 from django_inlines import registry, renderer
+from django_inlines.inlines.template_inlines import (
+    template_cache, resolved_templates,)
 
 from test_app.inlines import BasicTemplateInline, MarkdownTemplateInline
 
@@ -10,6 +12,16 @@ from .test_common import InlinesTestCase
 __all__ = ('TemplateInlineTestCase',)
 
 
+class DynamicTemplateInline(BasicTemplateInline):
+
+    def get_template_extension(self, variant=None, media=None):
+        return self.data.get('arg1', 'html')
+
+    class Meta(object):
+        app_label = 'test_app'
+        cache_templates = False
+
+
 class TemplateInlineTestCase(InlinesTestCase):
 
     def setUp(self):
@@ -100,3 +112,71 @@ class TemplateInlineTestCase(InlinesTestCase):
         self.assertEqual(
             u'arg1', renderer.render(
                 u'{{ echo_template:downer ARG1 }}', raise_errors=True))
+
+    def test_template_cache(self):
+        template_cache.clear()
+
+        inline = MarkdownTemplateInline('echo_template', 'arg1')
+        templates = inline.get_templates(variant='upper', media='media')
+
+        self.assertEqual(1, len(template_cache))
+        self.assertEqual(
+            templates, MarkdownTemplateInline('echo_template', 'arg2')
+            .get_templates(variant='upper', media='media'))
+        self.assertEqual(1, len(template_cache))
+
+        # Other slugs and classes have their own candidates
+        self.assertNotEqual(
+            templates, MarkdownTemplateInline('echo_markdown', 'arg1')
+            .get_templates(variant='upper', media='media'))
+        self.assertNotEqual(
+            templates, BasicTemplateInline('echo_template', 'arg1')
+            .get_templates(variant='upper', media='media'))
+        self.assertEqual(3, len(template_cache))
+
+    def test_template_cache_opt_out(self):
+        template_cache.clear()
+
+        for ext in ('md', 'txt',):
+            inline = DynamicTemplateInline('echo_template', ext)
+            inline.process()
+
+            self.assertEqual(
+                'inlines/test_app/echo_template.%s' % ext,
+                inline.get_templates()[0])
+
+        self.assertEqual(0, len(template_cache))
+
+    def test_resolved_template_cache(self):
+        registry.register('echo_markdown', MarkdownTemplateInline)
+        resolved_templates.clear()
+
+        for i in range(2):
+            self.assertEqual(
+                u'**Hello**', renderer.render(
+                    u'{{ echo_markdown Hello }}', raise_errors=True))
+
+        template, = resolved_templates.values()
+        self.assertIsNotNone(template)
+
+        # Changes to the template settings throw the templates away
+        with self.settings(TEMPLATE_DIRS=()):
+            self.assertEqual(0, len(resolved_templates))
+
+    def test_resolved_template_cache_missing(self):
+        resolved_templates.clear()
+
+        with self.settings(INLINE_DEBUG=True):
+            for i in range(2):
+                self.assertRaises(
+                    TemplateDoesNotExist, renderer.render,
+                    u'{{ echo_template arg1 }}', None, True)
+
+            self.assertEqual([None], list(resolved_templates.values()))
+
+            # Nothing is kept while debugging
+            with self.settings(DEBUG=True):
+                self.assertRaises(
+                    TemplateDoesNotExist, renderer.render,
+                    u'{{ echo_template arg1 }}', None, True)
+                self.assertEqual(0, len(resolved_templates))